@@ -1,7 +1,114 @@
+import json
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.utils import get_last_value_from_parameters
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from .models import Movie, Genre, Cinema, Hall, Session, Ticket
 
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без точного COUNT(*) по большим таблицам.
+    На PostgreSQL берёт оценку планировщика (EXPLAIN, в том числе с
+    фильтрами); иначе считает строки не дальше окна за запрошенной
+    страницей, поэтому листать можно сколь угодно далеко. Неточное
+    число помечается is_estimate и выводится в админке как оценка.
+    """
+    COUNT_LIMIT = 10000
+    PAGES_AHEAD = 10
+
+    def __init__(self, *args, requested_page=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested_page = requested_page
+        self.is_estimate = False
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, "query", None)
+        if query is None:
+            return super().count
+        limit = max(self.COUNT_LIMIT, (self.requested_page + self.PAGES_AHEAD) * self.per_page)
+        if connection.vendor == "postgresql":
+            estimate = self._planner_estimate()
+            if estimate > limit:
+                self.is_estimate = True
+                return estimate
+        count = self.object_list[:limit + 1].count()
+        if count > limit:
+            self.is_estimate = True
+            return limit
+        return count
+
+    def _planner_estimate(self) -> int:
+        sql, params = self.object_list.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Фильтр по внешнему ключу через autocomplete вместо полного списка значений."""
+    template = "admin/app_kino/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        self.lookup_val = get_last_value_from_parameters(params, self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site, attrs={"style": "width: 100%"}),
+            required=False,
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.lookup_val is None,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "url_template": changelist.get_query_string({self.lookup_kwarg: "__value__"}),
+            "widget": self.form_field.widget.render(
+                f"filter_{self.field_path}", self.lookup_val, attrs={"id": f"filter_{self.field_path}"}
+            ),
+            "widget_id": f"filter_{self.field_path}",
+        }
+
+
+class ScalableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, requested_page=page)
+
+    @property
+    def media(self):
+        media = super().media
+        for spec in self.list_filter:
+            if isinstance(spec, tuple) and spec[1] is AutocompleteFilter:
+                field = self.model._meta.get_field(spec[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+                break
+        return media
+
+
 class SessionInline(admin.TabularInline):
     model = Session
     extra = 1
@@ -12,9 +119,10 @@ class MovieAdmin(admin.ModelAdmin):
     list_display = ("title", "release_date", "country", "age_rating", "poster_preview")
     search_fields = ("title", "original_title")
     list_filter = ("country", "age_rating", "release_date")
-    readonly_fields = ("poster_preview",)
+    readonly_fields = ("poster_preview", "upcoming_sessions", "next_session_at", "min_upcoming_price")
     filter_horizontal = ("genres",)
     date_hierarchy = "release_date"
+    ordering = ("title",)
 
     def poster_preview(self, obj):
         url = (obj.poster or "").strip() or "/static/img/no-poster.png"
@@ -30,22 +138,46 @@ class GenreAdmin(admin.ModelAdmin):
 class CinemaAdmin(admin.ModelAdmin):
     list_display = ("name", "address", "phone")
     search_fields = ("name", "address")
+    ordering = ("name",)
     inlines = [SessionInline]
 
 @admin.register(Hall)
 class HallAdmin(admin.ModelAdmin):
     list_display = ("name", "cinema", "seats")
     list_filter = ("cinema",)
-    search_fields = ("name",)
+    list_select_related = ("cinema",)
+    search_fields = ("name", "cinema__name")
+    ordering = ("cinema__name", "name")
+
+    def get_queryset(self, request):
+        # autocomplete залов (фильтры сеансов) строит список через get_queryset,
+        # а не через list_select_related
+        return super().get_queryset(request).select_related("cinema")
 
 
 @admin.register(Session)
-class SessionAdmin(admin.ModelAdmin):
+class SessionAdmin(ScalableAdminMixin, admin.ModelAdmin):
     list_display = ("movie", "cinema", "hall", "start_time", "price")
-    list_filter = ("cinema", "hall", "movie", "start_time")
-    date_hierarchy = "start_time"
-    search_fields = ("movie__title", "hall__name", "cinema__name")
+    list_filter = (
+        ("cinema", AutocompleteFilter),
+        ("hall", AutocompleteFilter),
+        ("movie", AutocompleteFilter),
+        "start_time",
+    )
+    list_select_related = ("movie", "cinema", "hall", "hall__cinema")
+    search_fields = ("^movie__title",)
+    search_help_text = "Начало названия фильма; кинотеатр и зал — в фильтрах справа."
     raw_id_fields = ('movie', 'hall', 'cinema')
 
+    def get_queryset(self, request):
+        # autocomplete сеансов (фильтр билетов) выводит str(session) с названием фильма
+        return super().get_queryset(request).select_related("movie")
 
 
+@admin.register(Ticket)
+class TicketAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    list_display = ("id", "session", "seat_number", "user", "is_paid")
+    list_filter = ("is_paid", ("session", AutocompleteFilter))
+    list_select_related = ("session", "session__movie", "user")
+    search_fields = ("^session__movie__title",)
+    raw_id_fields = ("session", "user")
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AppKinoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_kino'
+
+    def ready(self):
+        from . import counters, facets, refdata
+        counters.connect_signals()
+        facets.connect_signals()
+        refdata.connect_signals()
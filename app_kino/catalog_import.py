@@ -0,0 +1,258 @@
+"""
+Пакетный импорт каталога из фидов дистрибьюторов (JSONL или CSV).
+
+Существующие фильмы индексируются в памяти по нормализованному ключу
+(original_title, release_date). updated_at записи фида сравнивается
+с сохранённым Movie.source_updated_at (отметкой фида при прошлом импорте),
+а не с локальным auto_now. Фид читается потоково пачками; на пачку
+уходит фиксированное число запросов: недостающие жанры, догрузка
+изменяемых фильмов, bulk_create/bulk_update фильмов и перезапись
+связей Movie.genres через bulk_create. Сигналы при bulk-операциях
+не срабатывают, поэтому фасеты и справочники сбрасываются явно.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import facets, refdata
+from .models import Genre, Movie
+
+FIELDS = ("title", "original_title", "description", "release_date",
+          "duration", "country", "age_rating", "poster")
+BATCH_SIZE = 1000
+
+
+class FeedError(ValueError):
+    pass
+
+
+@dataclass
+class ImportStats:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    genres_created: int = 0
+    batches: int = 0
+    queries: int = 0
+    errors: list = field(default_factory=list)
+
+
+def normalize(text) -> str:
+    return " ".join(str(text or "").split()).casefold()
+
+
+def movie_key(original_title, title, release_date):
+    return normalize(original_title or title), release_date
+
+
+def read_feed(fh, fmt):
+    """Построчно отдаёт (номер строки, dict) из JSONL или CSV."""
+    if fmt == "jsonl":
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if line:
+                try:
+                    yield lineno, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield lineno, FeedError(f"некорректный JSON: {exc}")
+    elif fmt == "csv":
+        for lineno, row in enumerate(csv.DictReader(fh), 2):
+            yield lineno, row
+    else:
+        raise FeedError(f"неизвестный формат: {fmt}")
+
+
+def parse_row(raw):
+    """Приводит запись фида к полям Movie; genres — список названий, updated_at — aware datetime или None."""
+    title = str(raw.get("title") or "").strip()
+    original_title = str(raw.get("original_title") or "").strip()
+    if not title and not original_title:
+        raise FeedError("нет названия")
+
+    try:
+        duration = int(raw.get("duration") or 0)
+    except (TypeError, ValueError):
+        raise FeedError(f"некорректная длительность: {raw.get('duration')!r}")
+    if duration <= 0:
+        raise FeedError("не указана длительность")
+
+    release_date = raw.get("release_date") or None
+    if release_date:
+        try:
+            release_date = date.fromisoformat(str(release_date)[:10])
+        except ValueError:
+            raise FeedError(f"некорректная дата выхода: {release_date!r}")
+
+    updated_at = raw.get("updated_at") or None
+    if updated_at:
+        updated_at = parse_datetime(str(updated_at))
+        if updated_at is None:
+            raise FeedError(f"некорректный updated_at: {raw.get('updated_at')!r}")
+        if timezone.is_naive(updated_at):
+            updated_at = timezone.make_aware(updated_at)
+
+    genres = raw.get("genres") or []
+    if isinstance(genres, str):
+        genres = genres.replace("|", ",").split(",")
+    genres = [g.strip() for g in genres if g and g.strip()]
+
+    values = {
+        "title": title or original_title,
+        "original_title": original_title,
+        "description": str(raw.get("description") or ""),
+        "release_date": release_date,
+        "duration": duration,
+        "country": str(raw.get("country") or "").strip(),
+        "age_rating": str(raw.get("age_rating") or "").strip(),
+        "poster": str(raw.get("poster") or "").strip(),
+    }
+    return values, genres, updated_at
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=BATCH_SIZE, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.stats = ImportStats()
+        self.index = {}
+        for pk, original_title, title, release_date, source_updated_at in (
+            Movie.objects.values_list("pk", "original_title", "title", "release_date", "source_updated_at")
+            .iterator(chunk_size=5000)
+        ):
+            self.index[movie_key(original_title, title, release_date)] = (pk, source_updated_at)
+        self.genres = {normalize(name): pk for pk, name in Genre.objects.values_list("pk", "name")}
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.stats.queries += 1
+        return execute(sql, params, many, context)
+
+    def run(self, rows):
+        batch = {}
+        with connection.execute_wrapper(self._count_query):
+            for lineno, raw in rows:
+                try:
+                    if isinstance(raw, Exception):
+                        raise raw
+                    values, genres, updated_at = parse_row(raw)
+                except FeedError as exc:
+                    self.stats.skipped += 1
+                    self.stats.errors.append((lineno, str(exc)))
+                    continue
+                key = movie_key(values["original_title"], values["title"], values["release_date"])
+                batch[key] = (values, genres, updated_at)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch)
+                    batch = {}
+            if batch:
+                self._flush(batch)
+
+        if self.stats.created or self.stats.updated or self.stats.genres_created:
+            facets.invalidate()
+            if self.stats.genres_created:
+                refdata.invalidate()
+        return self.stats
+
+    def _resolve_genres(self, names):
+        missing = {normalize(n): n for n in names if normalize(n) not in self.genres}
+        if not missing:
+            return
+        # жанры, созданные после построения индекса (другим импортом), не считаем новыми
+        existing = dict(Genre.objects.filter(name__in=list(missing.values())).values_list("name", "pk"))
+        for name, pk in existing.items():
+            self.genres[normalize(name)] = pk
+        to_create = [n for key, n in missing.items() if key not in self.genres]
+        self.stats.genres_created += len(to_create)
+        if to_create and not self.dry_run:
+            Genre.objects.bulk_create([Genre(name=n) for n in to_create], ignore_conflicts=True)
+            for pk, name in Genre.objects.filter(name__in=to_create).values_list("pk", "name"):
+                self.genres[normalize(name)] = pk
+
+    def _flush(self, batch):
+        self.stats.batches += 1
+        with transaction.atomic():
+            self._resolve_genres({g for _, genres, _ in batch.values() for g in genres})
+
+            to_create, create_genres = [], []
+            updates = {}
+            for key, (values, genres, updated_at) in batch.items():
+                existing = self.index.get(key)
+                if existing is None:
+                    to_create.append(Movie(**values, source_updated_at=updated_at))
+                    create_genres.append(genres)
+                else:
+                    pk, source_updated_at = existing
+                    if updated_at is None or source_updated_at is None or updated_at > source_updated_at:
+                        updates[pk] = (values, genres, updated_at)
+                    else:
+                        self.stats.unchanged += 1
+
+            to_update, changed_fields, genre_sets = self._diff(updates)
+            self.stats.updated += len({m.pk for m in to_update} | set(genre_sets))
+
+            if self.dry_run:
+                self.stats.created += len(to_create)
+                return
+
+            created = Movie.objects.bulk_create(to_create)
+            for movie, genres in zip(created, create_genres):
+                self.index[movie_key(movie.original_title, movie.title, movie.release_date)] = (movie.pk, movie.source_updated_at)
+                genre_sets[movie.pk] = genres
+            self.stats.created += len(created)
+
+            if to_update:
+                Movie.objects.bulk_update(to_update, sorted(changed_fields | {"updated_at"}))
+                for movie in to_update:
+                    self.index[movie_key(movie.original_title, movie.title, movie.release_date)] = (movie.pk, movie.source_updated_at)
+
+            self._write_genres(genre_sets)
+
+    def _diff(self, updates):
+        """Оставляет только реально изменившиеся фильмы и жанры (два запроса на пачку)."""
+        if not updates:
+            return [], set(), {}
+
+        movies = Movie.objects.in_bulk(list(updates))
+        current = {}
+        for movie_id, genre_id in Movie.genres.through.objects.filter(movie_id__in=list(updates)).values_list("movie_id", "genre_id"):
+            current.setdefault(movie_id, set()).add(genre_id)
+
+        to_update, changed_fields, genre_sets = [], set(), {}
+        for pk, (values, genres, updated_at) in updates.items():
+            movie = movies.get(pk)
+            if movie is None:
+                continue
+            changed = {name for name in FIELDS if getattr(movie, name) != values[name]}
+            genre_ids = {self.genres[normalize(g)] for g in genres if normalize(g) in self.genres}
+            if genres and genre_ids != current.get(pk, set()):
+                genre_sets[pk] = genres
+            if changed:
+                for name in changed:
+                    setattr(movie, name, values[name])
+                # bulk_update не вызывает auto_now
+                movie.updated_at = timezone.now()
+                if updated_at is not None:
+                    movie.source_updated_at = updated_at
+                    changed.add("source_updated_at")
+                changed_fields |= changed
+                to_update.append(movie)
+            elif pk not in genre_sets:
+                self.stats.unchanged += 1
+        return to_update, changed_fields, genre_sets
+
+    def _write_genres(self, genre_sets):
+        if not genre_sets:
+            return
+        through = Movie.genres.through
+        through.objects.filter(movie_id__in=list(genre_sets)).delete()
+        through.objects.bulk_create([
+            through(movie_id=movie_id, genre_id=self.genres[normalize(name)])
+            for movie_id, names in genre_sets.items()
+            for name in {normalize(n): n for n in names}.values()
+            if normalize(name) in self.genres
+        ], ignore_conflicts=True)
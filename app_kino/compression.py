@@ -0,0 +1,146 @@
+"""
+Сжатие ответов: gzip (всегда) и brotli (если установлен пакет brotli
+и COMPRESSION_BROTLI включён), кодировка выбирается по Accept-Encoding.
+
+Обычные ответы сжимает GZipMiddleware Django (или brotli). Потоковые
+(синхронные и асинхронные) сжимаются на лету с принудительным сбросом
+после каждого куска, чтобы шапка страницы уходила клиенту сразу, а не
+после накопления буфера zlib.
+Как и в GZipMiddleware, в gzip-заголовок добавляется случайное имя файла
+(защита от BREACH). У brotli такого места для случайной добавки нет,
+поэтому ответы, которые ставят cookie или зависят от них (Vary: Cookie —
+CSRF-токен, сессия), brotli не сжимаются и уходят в gzip.
+"""
+import secrets
+import string
+import struct
+import zlib
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import has_vary_header, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepted(request) -> dict[str, float]:
+    result = {}
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            result[name.strip().lower()] = q
+    return result
+
+
+def negotiate(request, allow_brotli=True) -> str | None:
+    accepted = _accepted(request)
+    if (allow_brotli and brotli is not None and getattr(settings, "COMPRESSION_BROTLI", True)
+            and accepted.get("br", 0) > 0):
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _may_carry_secrets(response) -> bool:
+    """Ответ ставит cookie или зависит от них — в теле может быть секрет (BREACH)."""
+    return bool(response.cookies) or has_vary_header(response, "Cookie")
+
+
+class _GzipEncoder:
+    """gzip-член по кускам: случайное FNAME в заголовке, Z_SYNC_FLUSH после каждого куска."""
+
+    def __init__(self, max_random_bytes):
+        name = "".join(secrets.choice(string.ascii_letters) for _ in range(secrets.randbelow(max_random_bytes + 1)))
+        flags = 0x08 if name else 0
+        self.header = (b"\x1f\x8b\x08" + bytes([flags]) + b"\0\0\0\0\x00\xff"
+                       + (name.encode() + b"\0" if name else b""))
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.crc = self.size = 0
+
+    def encode(self, chunk):
+        self.crc = zlib.crc32(chunk, self.crc)
+        self.size += len(chunk)
+        return self.compressor.compress(chunk) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush() + struct.pack("<II", self.crc & 0xFFFFFFFF, self.size & 0xFFFFFFFF)
+
+
+class _BrotliEncoder:
+    header = b""
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=5)
+
+    def encode(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def _encode_stream(chunks, encoder):
+    if encoder.header:
+        yield encoder.header
+    for chunk in chunks:
+        if chunk:
+            yield encoder.encode(chunk)
+    yield encoder.finish()
+
+
+async def _aencode_stream(chunks, encoder):
+    if encoder.header:
+        yield encoder.header
+    async for chunk in chunks:
+        if chunk:
+            yield encoder.encode(chunk)
+    yield encoder.finish()
+
+
+def _gzip_stream(chunks, max_random_bytes):
+    return _encode_stream(chunks, _GzipEncoder(max_random_bytes))
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        if not response.streaming and len(response.content) < 200:
+            return response
+
+        encoding = negotiate(request, allow_brotli=not _may_carry_secrets(response))
+        if encoding == "gzip" and not response.streaming:
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            encoder = _BrotliEncoder() if encoding == "br" else _GzipEncoder(self.max_random_bytes)
+            stream = _aencode_stream if response.is_async else _encode_stream
+            response.streaming_content = stream(response.streaming_content, encoder)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=5)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,104 @@
+"""
+Денормализованные счётчики будущих сеансов на Movie: число сеансов,
+ближайший сеанс и минимальная цена. Сигналы на запись Session только
+запоминают затронутые фильмы; пересчёт — один refresh() на транзакцию,
+после коммита (каскадное удаление фильма, зала или кинотеатра со всеми
+сеансами даёт один пересчёт, а не по сеансу). Периодическая команда
+refresh_session_counters поправляет фильмы, чьи сеансы ушли в прошлое
+(next_session_at <= now).
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Count, Min
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import Movie, Session
+
+FIELDS = list(Movie.COUNTER_FIELDS)
+BATCH_SIZE = 1000
+
+_pending = threading.local()
+
+
+def refresh(movie_ids=None, batch_size=BATCH_SIZE) -> int:
+    """Пересчитывает счётчики для movie_ids (None — для всех фильмов). Возвращает число фильмов."""
+    now = timezone.now()
+    sessions = Session.objects.filter(start_time__gte=now)
+    movies = Movie.objects.only("pk", *FIELDS)
+    if movie_ids is not None:
+        movie_ids = list(movie_ids)
+        sessions = sessions.filter(movie_id__in=movie_ids)
+        movies = movies.filter(pk__in=movie_ids)
+
+    stats = {
+        row["movie_id"]: row
+        for row in sessions.order_by().values("movie_id").annotate(
+            n=Count("id"), next_at=Min("start_time"), min_price=Min("price")
+        )
+    }
+
+    changed = []
+    for movie in movies.iterator(chunk_size=batch_size):
+        row = stats.get(movie.pk)
+        values = (row["n"], row["next_at"], row["min_price"]) if row else (0, None, None)
+        if (movie.upcoming_sessions, movie.next_session_at, movie.min_upcoming_price) != values:
+            movie.upcoming_sessions, movie.next_session_at, movie.min_upcoming_price = values
+            changed.append(movie)
+    Movie.objects.bulk_update(changed, FIELDS, batch_size=batch_size)
+    return len(changed)
+
+
+def refresh_stale(batch_size=BATCH_SIZE) -> int:
+    """Поправляет фильмы, у которых ближайший сеанс уже начался."""
+    stale = Movie.objects.filter(next_session_at__lte=timezone.now()).values_list("pk", flat=True)
+    return refresh(stale, batch_size=batch_size)
+
+
+def schedule(movie_ids):
+    """Пересчитать фильмы после коммита текущей транзакции (вне транзакции — сразу)."""
+    ids = getattr(_pending, "ids", None)
+    if ids is None:
+        ids = _pending.ids = set()
+    ids.update(pk for pk in movie_ids if pk is not None)
+    # колбэк на каждый вызов: первый после коммита пересчитывает всё накопленное,
+    # остальные видят пустое множество; после отката фильмы уйдут в следующий коммит
+    transaction.on_commit(_flush)
+
+
+def _flush():
+    ids = getattr(_pending, "ids", None)
+    if ids:
+        _pending.ids = set()
+        refresh(ids)
+
+
+def _forget_movie(sender, instance, **kwargs):
+    # сеансы удалённого фильма ушли каскадом — пересчитывать нечего
+    ids = getattr(_pending, "ids", None)
+    if ids:
+        ids.discard(instance.pk)
+
+
+def _remember_movie(sender, instance, **kwargs):
+    instance._counters_old_movie_id = None
+    if not instance._state.adding:
+        instance._counters_old_movie_id = (
+            Session.objects.filter(pk=instance.pk).values_list("movie_id", flat=True).first()
+        )
+
+
+def _on_session_saved(sender, instance, **kwargs):
+    schedule([instance.movie_id, getattr(instance, "_counters_old_movie_id", None)])
+
+
+def _on_session_deleted(sender, instance, **kwargs):
+    schedule([instance.movie_id])
+
+
+def connect_signals():
+    pre_save.connect(_remember_movie, sender=Session, dispatch_uid="counters_session_pre_save")
+    post_save.connect(_on_session_saved, sender=Session, dispatch_uid="counters_session_save")
+    post_delete.connect(_on_session_deleted, sender=Session, dispatch_uid="counters_session_delete")
+    post_delete.connect(_forget_movie, sender=Movie, dispatch_uid="counters_movie_delete")
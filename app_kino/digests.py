@@ -0,0 +1,106 @@
+"""
+Дайджесты «новые сеансы ваших избранных фильмов».
+
+Один проход по сеансам, созданным после отметки (Watermark), группировка
+по фильмам, затем обратный индекс фильм -> пользователи из Favorite
+(несколько запросов на пачку фильмов, а не на пользователя). Записи
+дайджестов выдаются пачками: в таблицу DigestEntry или в JSONL-файл.
+
+created_at сеанса ставится при создании объекта, а не при коммите,
+поэтому сеанс из долгой транзакции может появиться уже после того,
+как отметка прошла его время. Окно читается с нахлёстом OVERLAP,
+а id сеансов, уже попавших в дайджесты в этом нахлёсте, хранятся
+в Watermark.recent_ids и повторно не выдаются.
+"""
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DigestEntry, Favorite, Session, Watermark
+
+WATERMARK_KEY = "digests"
+MOVIE_CHUNK = 500
+OVERLAP = timedelta(minutes=10)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def new_sessions_by_movie(since, until, seen=()):
+    """
+    Будущие сеансы, созданные в (since - OVERLAP, until], кроме seen.
+    Возвращает (movie_id -> [session_id, ...], id сеансов в окне нахлёста перед until).
+    """
+    seen = set(seen)
+    by_movie = defaultdict(list)
+    recent = []
+    rows = (
+        Session.objects
+        .filter(created_at__gt=since - OVERLAP, created_at__lte=until, start_time__gte=until)
+        .order_by("start_time")
+        .values_list("id", "movie_id", "created_at")
+    )
+    for session_id, movie_id, created_at in rows.iterator(chunk_size=5000):
+        if created_at > until - OVERLAP:
+            recent.append(session_id)
+        if session_id not in seen:
+            by_movie[movie_id].append(session_id)
+    return by_movie, recent
+
+
+def collect(by_movie):
+    """user_id -> [session_id, ...] через обратный индекс фильм -> пользователи."""
+    per_user = defaultdict(list)
+    for movie_ids in _chunks(list(by_movie), MOVIE_CHUNK):
+        fans = Favorite.objects.filter(movie_id__in=movie_ids).values_list("movie_id", "user_id")
+        for movie_id, user_id in fans.iterator(chunk_size=5000):
+            per_user[user_id].extend(by_movie[movie_id])
+    return per_user
+
+
+def iter_entries(per_user, now):
+    for user_id, session_ids in per_user.items():
+        yield DigestEntry(user_id=user_id, sessions=session_ids, created_at=now)
+
+
+def build(since=None, output=None, batch_size=1000):
+    """
+    Строит дайджесты по сеансам, созданным после прошлого запуска
+    (или после since, если отметки ещё нет). Возвращает (сеансов, пользователей).
+    """
+    now = timezone.now()
+    watermark = Watermark.objects.filter(key=WATERMARK_KEY).first()
+    seen = ()
+    if watermark is not None:
+        since, seen = watermark.value, watermark.recent_ids
+    elif since is None:
+        since = now - timedelta(days=1)
+
+    by_movie, recent = new_sessions_by_movie(since, now, seen)
+    per_user = collect(by_movie)
+    entries = iter_entries(per_user, now)
+
+    with transaction.atomic():
+        if output is not None:
+            for entry in entries:
+                output.write(json.dumps(
+                    {"user": entry.user_id, "sessions": entry.sessions, "created_at": now.isoformat()},
+                    ensure_ascii=False,
+                ) + "\n")
+        else:
+            batch = []
+            for entry in entries:
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    DigestEntry.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                DigestEntry.objects.bulk_create(batch)
+        Watermark.objects.update_or_create(key=WATERMARK_KEY, defaults={"value": now, "recent_ids": recent})
+
+    return sum(len(ids) for ids in by_movie.values()), len(per_user)
@@ -0,0 +1,165 @@
+"""
+Фасетный индекс каталога фильмов.
+
+Каждому фильму присваивается позиция (порядок — как в списке фильмов:
+по названию), а каждому значению фасета — битовая маска (int) позиций
+фильмов с этим значением. Пересечение фильтров — побитовое И, счётчик
+значения — int.bit_count(). Индекс строится лениво и
+перестраивается при смене общей отметки версии, которую обновляют
+сигналы изменения Movie/Genre и связи Movie.genres.
+"""
+from threading import Lock
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from . import refdata
+from .models import Genre, Movie
+from .versioning import SharedVersion
+
+FACETS = ("genre", "country", "age_rating", "year")
+
+# позиции единичных битов для каждого значения байта
+_BYTE_BITS = [tuple(i for i in range(8) if b >> i & 1) for b in range(256)]
+
+
+class FacetIndex:
+    __slots__ = ("version", "ids", "position", "all_bits", "bits", "labels")
+
+    def __init__(self, version, ids, position, bits, labels):
+        self.version = version
+        self.ids = ids
+        self.position = position
+        self.all_bits = (1 << len(ids)) - 1
+        self.bits = bits
+        self.labels = labels
+
+    @classmethod
+    def build(cls, version=None):
+        rows = Movie.objects.order_by("title", "pk").values_list(
+            "pk", "country", "age_rating", "release_date"
+        )
+        ids = []
+        position = {}
+        bits = {facet: {} for facet in FACETS}
+
+        for pos, (pk, country, age_rating, release_date) in enumerate(rows):
+            ids.append(pk)
+            position[pk] = pos
+            bit = 1 << pos
+            for facet, value in (
+                ("country", country),
+                ("age_rating", age_rating),
+                ("year", str(release_date.year) if release_date else ""),
+            ):
+                if value:
+                    bits[facet][value] = bits[facet].get(value, 0) | bit
+
+        genre_bits = bits["genre"]
+        for movie_id, genre_id in Movie.genres.through.objects.values_list("movie_id", "genre_id"):
+            pos = position.get(movie_id)
+            if pos is not None:
+                key = str(genre_id)
+                genre_bits[key] = genre_bits.get(key, 0) | (1 << pos)
+
+        labels = {
+            "genre": {str(g.pk): g.name for g in refdata.get().genres_sorted},
+        }
+        return cls(version, ids, position, bits, labels)
+
+    def _facet_mask(self, facet, values):
+        """Маска по одному фасету: значения внутри фасета объединяются через ИЛИ."""
+        if not values:
+            return self.all_bits
+        mask = 0
+        table = self.bits[facet]
+        for value in values:
+            mask |= table.get(value, 0)
+        return mask
+
+    def select(self, selected):
+        """
+        Возвращает (mask, counts) для выбранных значений фасетов.
+
+        selected — {facet: [value, ...]}; между фасетами — И.
+        counts[facet] — список (value, label, count, is_selected), где count
+        считается с учётом фильтров по остальным фасетам.
+        Число фильмов — mask.bit_count(), их id — ids_for(mask).
+        """
+        masks = {facet: self._facet_mask(facet, selected.get(facet)) for facet in FACETS}
+
+        result = self.all_bits
+        for mask in masks.values():
+            result &= mask
+
+        counts = {}
+        for facet in FACETS:
+            others = self.all_bits
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            chosen = set(selected.get(facet) or ())
+            labels = self.labels.get(facet, {})
+            items = []
+            for value, bits in self.bits[facet].items():
+                count = (bits & others).bit_count()
+                if count or value in chosen:
+                    items.append((value, labels.get(value, value), count, value in chosen))
+            if facet == "year":
+                items.sort(key=lambda item: item[0], reverse=True)
+            else:
+                items.sort(key=lambda item: item[1].casefold())
+            counts[facet] = items
+
+        return result, counts
+
+    def genre_ids(self, movie_id) -> list[int]:
+        """Жанры фильма без запроса к связующей таблице."""
+        pos = self.position.get(movie_id)
+        if pos is None:
+            return []
+        return [int(value) for value, bits in self.bits["genre"].items() if bits >> pos & 1]
+
+    def ids_for(self, mask) -> list:
+        """id фильмов по маске в порядке позиций; линейно, побайтно."""
+        ids = self.ids
+        out = []
+        data = mask.to_bytes((len(ids) + 7) // 8 or 1, "little")
+        for offset, byte in enumerate(data):
+            if byte:
+                base = offset * 8
+                out.extend(ids[base + i] for i in _BYTE_BITS[byte])
+        return out
+
+
+version = SharedVersion("app_kino:facets")
+_index = None
+_lock = Lock()
+
+
+def get_index() -> FacetIndex:
+    global _index
+    current = version.current()
+    index = _index
+    if index is None or index.version != current:
+        with _lock:
+            if _index is None or _index.version != current:
+                _index = FacetIndex.build(current)
+            index = _index
+    return index
+
+
+def invalidate(**kwargs):
+    version.bump()
+
+
+def _on_genres_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate()
+
+
+def connect_signals():
+    post_save.connect(invalidate, sender=Movie, dispatch_uid="facets_movie_save")
+    post_delete.connect(invalidate, sender=Movie, dispatch_uid="facets_movie_delete")
+    post_save.connect(invalidate, sender=Genre, dispatch_uid="facets_genre_save")
+    post_delete.connect(invalidate, sender=Genre, dispatch_uid="facets_genre_delete")
+    m2m_changed.connect(_on_genres_changed, sender=Movie.genres.through, dispatch_uid="facets_movie_genres")
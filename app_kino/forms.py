@@ -1,4 +1,5 @@
 from django import forms
+from . import refdata
 from .models import Movie
 
 class MovieForm(forms.ModelForm):
@@ -13,3 +14,7 @@ class MovieForm(forms.ModelForm):
             "genres": forms.SelectMultiple(attrs={"size": 8})
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # список жанров — из процессного кэша справочников, без запроса на каждый рендер
+        self.fields["genres"].choices = [(g.pk, g.name) for g in refdata.get().genres_sorted]
@@ -0,0 +1,270 @@
+"""
+Нагрузочное тестирование: поднимает приложение локально (runserver,
+gunicorn или uvicorn) и гоняет по нему N параллельных клиентов со
+смесью сценариев, например detail=70,search=20,buy=10.
+
+Клиенты — потоки на urllib (без внешних зависимостей). По каждому
+сценарию считаются пропускная способность, p50/p95/p99 задержки,
+ошибки, конфликты (409) и таймауты блокировок (503 от session_buy).
+
+Покупки идут от временного пользователя, который создаётся на время
+прогона; его билеты и он сам удаляются в конце, так что тест можно
+гонять и по рабочей базе. Для buy берутся ближайшие сеансы, в которых
+ещё есть свободные места.
+"""
+import http.cookiejar
+import importlib.util
+import json
+import random
+import secrets
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Movie, Session, Ticket, User
+
+SEARCH_TERMS = ["звёзд", "война", "гринч", "кот", "матрица", "любовь", "дом"]
+SERVERS = ("runserver", "gunicorn", "uvicorn")
+SCENARIOS = ("detail", "search", "buy", "list", "home")
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, workers: int):
+    """Запускает сервер в подпроцессе, возвращает (process, base_url)."""
+    port = _free_port()
+    address = f"127.0.0.1:{port}"
+    if kind == "runserver":
+        cmd = [sys.executable, str(settings.BASE_DIR / "manage.py"), "runserver", address, "--noreload"]
+    elif kind == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "web.wsgi:application", "-b", address,
+               "-w", str(workers), "--threads", "4"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "web.asgi:application", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+
+    process = subprocess.Popen(cmd, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Сервер {kind} завершился с кодом {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process, f"http://{address}"
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Сервер {kind} не поднялся за 20 секунд")
+
+
+def server_available(kind: str) -> bool:
+    return kind == "runserver" or importlib.util.find_spec(kind) is not None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Client:
+    """Один виртуальный пользователь: свои cookies и CSRF-токен."""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect()
+        )
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return None
+
+    def login(self, username, password):
+        self.request("/accounts/login/")
+        status = self.request("/accounts/login/", data={"username": username, "password": password})
+        if status != 302:
+            raise RuntimeError(f"Не удалось войти как {username}: HTTP {status}")
+
+    def request(self, path, data=None):
+        headers = {}
+        body = None
+        if data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers["X-CSRFToken"] = self.csrf_token() or ""
+            headers["Referer"] = self.base_url + "/"
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+
+class LoadTest:
+    def __init__(self, base_url, mix, clients=10, duration=30.0, hot_sessions=3, timeout=10.0):
+        self.base_url = base_url
+        self.mix = mix
+        self.clients = clients
+        self.duration = duration
+        self.timeout = timeout
+        self.movie_ids = list(Movie.objects.values_list("pk", flat=True))
+        self.hot_sessions = list(
+            Session.objects
+            .filter(start_time__gte=timezone.now())
+            .annotate(sold=Count("tickets"))
+            .filter(sold__lt=F("hall__seats"))
+            .order_by("start_time")
+            .values_list("pk", "movie_id")[:hot_sessions]
+        )
+        self.username = f"loadtest-{secrets.token_hex(4)}"
+        self.password = secrets.token_urlsafe(16)
+        self.tickets_deleted = 0
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def _pick(self, rnd):
+        names = list(self.mix)
+        return rnd.choices(names, weights=[self.mix[n] for n in names])[0]
+
+    def _scenario(self, client, name, rnd):
+        if name == "detail":
+            return client.request(f"/movies/{rnd.choice(self.movie_ids)}/")
+        if name == "search":
+            return client.request("/search/?" + urllib.parse.urlencode({"q": rnd.choice(SEARCH_TERMS)}))
+        if name == "list":
+            return client.request("/movies/")
+        if name == "home":
+            return client.request("/")
+        if name == "buy":
+            session_id, movie_id = rnd.choice(self.hot_sessions)
+            if client.csrf_token() is None:
+                client.request(f"/movies/{movie_id}/")
+            return client.request(f"/sessions/{session_id}/buy/", data={})
+
+    def _worker(self, seed, deadline):
+        rnd = random.Random(seed)
+        client = Client(self.base_url, self.timeout)
+        if "buy" in self.mix:
+            try:
+                client.login(self.username, self.password)
+            except (RuntimeError, urllib.error.URLError, OSError):
+                with self._lock:
+                    self.statuses["login"][0] += 1
+                return
+        while time.monotonic() < deadline:
+            name = self._pick(rnd)
+            started = time.perf_counter()
+            try:
+                status = self._scenario(client, name, rnd)
+            except (urllib.error.URLError, OSError):
+                status = 0
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.latencies[name].append(elapsed)
+                self.statuses[name][status] += 1
+
+    def run(self):
+        unknown = set(self.mix) - set(SCENARIOS)
+        if unknown:
+            raise ValueError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+        if not self.movie_ids:
+            raise RuntimeError("В базе нет фильмов")
+        if "buy" in self.mix and not self.hot_sessions:
+            raise RuntimeError("Нет будущих сеансов со свободными местами для сценария buy")
+
+        if "buy" in self.mix:
+            get_user_model().objects.create_user(self.username, password=self.password)
+        try:
+            started = time.monotonic()
+            deadline = started + self.duration
+            threads = [
+                threading.Thread(target=self._worker, args=(seed, deadline), daemon=True)
+                for seed in range(self.clients)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return self.report(time.monotonic() - started)
+        finally:
+            if "buy" in self.mix:
+                self.cleanup()
+
+    def cleanup(self):
+        """Удаляет билеты, купленные во время прогона, и временного пользователя."""
+        self.tickets_deleted, _ = Ticket.objects.filter(user__username=self.username).delete()
+        User.objects.filter(username=self.username).delete()
+        get_user_model().objects.filter(username=self.username).delete()
+
+    def report(self, elapsed):
+        endpoints = {}
+        total = 0
+        login_failures = self.statuses.pop("login", {}).get(0, 0)
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            statuses = self.statuses[name]
+            count = len(values)
+            total += count
+            errors = sum(n for code, n in statuses.items() if code == 0 or (code >= 400 and code not in (409, 503)))
+            endpoints[name] = {
+                "requests": count,
+                "rps": round(count / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "error_rate": round(errors / count, 4),
+                "conflict_rate": round(statuses.get(409, 0) / count, 4),
+                "lock_timeout_rate": round(statuses.get(503, 0) / count, 4),
+                "statuses": {str(code): n for code, n in sorted(statuses.items())},
+            }
+        return {
+            "base_url": self.base_url,
+            "clients": self.clients,
+            "duration_s": round(elapsed, 2),
+            "mix": self.mix,
+            "total_requests": total,
+            "rps": round(total / elapsed, 2),
+            "login_failures": login_failures,
+            "endpoints": endpoints,
+        }
+
+
+def dump(result, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, ensure_ascii=False, indent=2)
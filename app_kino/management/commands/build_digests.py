@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app_kino import digests
+
+
+class Command(BaseCommand):
+    help = "Собирает дайджесты новых сеансов для пользователей, добавивших фильмы в избранное."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since-days", type=int, default=1,
+                            help="Глубина первого запуска, пока нет отметки (дней).")
+        parser.add_argument("--output", help="Писать дайджесты в JSONL-файл вместо таблицы.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, since_days, output, batch_size, **options):
+        since = timezone.now() - timedelta(days=since_days)
+        if output:
+            with open(output, "a", encoding="utf-8") as fh:
+                sessions, users = digests.build(since=since, output=fh, batch_size=batch_size)
+        else:
+            sessions, users = digests.build(since=since, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Новых сеансов: {sessions}, дайджестов: {users}"))
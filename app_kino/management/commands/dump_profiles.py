@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from app_kino import profiling
+
+
+class Command(BaseCommand):
+    help = "Выводит свёрнутые стеки сохранённых профилей (формат flamegraph.pl / speedscope)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--view", help="Имя представления, например app_kino:search.")
+        parser.add_argument("--top", type=int, default=0, help="Вместо стеков показать N горячих функций.")
+        parser.add_argument("--token", action="store_true",
+                            help="Выдать временный токен для заголовка X-Profile.")
+        parser.add_argument("--user", default="", help="Привязать токен к пользователю.")
+
+    def handle(self, *args, view, top, token, user, **options):
+        if token:
+            self.stdout.write(profiling.make_token(user))
+            return
+
+        for view_name, stacks in profiling.load(view).items():
+            if top:
+                self.stdout.write(self.style.MIGRATE_HEADING(view_name))
+                for func, count in profiling.hot_functions(stacks, top):
+                    self.stdout.write(f"  {count:>8}  {func}")
+            else:
+                for stack, count in stacks.most_common():
+                    self.stdout.write(f"{view_name};{stack} {count}")
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app_kino import catalog_import
+
+
+class Command(BaseCommand):
+    help = "Импортирует фильмы из фида (JSONL или CSV) с дедупликацией и пакетной записью."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл фида или '-' для stdin.")
+        parser.add_argument("--format", choices=("jsonl", "csv"),
+                            help="Формат; по умолчанию — по расширению файла.")
+        parser.add_argument("--batch-size", type=int, default=catalog_import.BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Ничего не записывать, только посчитать.")
+
+    def handle(self, *args, path, format, batch_size, dry_run, **options):
+        fmt = format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        importer = catalog_import.CatalogImporter(batch_size=batch_size, dry_run=dry_run)
+        try:
+            if path == "-":
+                stats = importer.run(catalog_import.read_feed(sys.stdin, fmt))
+            else:
+                with open(path, encoding="utf-8", newline="") as fh:
+                    stats = importer.run(catalog_import.read_feed(fh, fmt))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for lineno, error in stats.errors[:20]:
+            self.stderr.write(f"строка {lineno}: {error}")
+        if len(stats.errors) > 20:
+            self.stderr.write(f"... и ещё {len(stats.errors) - 20} ошибок")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if dry_run else ''}создано: {stats.created}, обновлено: {stats.updated}, "
+            f"без изменений: {stats.unchanged}, пропущено: {stats.skipped}, новых жанров: {stats.genres_created}; "
+            f"пачек: {stats.batches}, запросов: {stats.queries}"
+        ))
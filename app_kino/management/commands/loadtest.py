@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_kino import loadtest
+
+
+class Command(BaseCommand):
+    help = "Нагрузочный тест: запускает сервер и гоняет смесь сценариев параллельными клиентами."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=10)
+        parser.add_argument("--duration", type=float, default=30.0, help="Секунд.")
+        parser.add_argument("--mix", default="detail=70,search=20,buy=10",
+                            help="Сценарии и веса: detail, search, buy, list, home.")
+        parser.add_argument("--hot-sessions", type=int, default=3)
+        parser.add_argument("--server", choices=loadtest.SERVERS, default="runserver")
+        parser.add_argument("--workers", type=int, default=2, help="Процессов gunicorn/uvicorn.")
+        parser.add_argument("--url", help="Не запускать сервер, а бить в уже поднятый.")
+        parser.add_argument("--timeout", type=float, default=10.0)
+        parser.add_argument("--output", help="Куда сохранить результаты в JSON.")
+
+    def handle(self, *args, **options):
+        process = None
+        base_url = options["url"]
+        if not base_url:
+            if not loadtest.server_available(options["server"]):
+                raise CommandError(f"{options['server']} не установлен")
+            try:
+                process, base_url = loadtest.start_server(options["server"], options["workers"])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        try:
+            test = loadtest.LoadTest(
+                base_url.rstrip("/"),
+                loadtest.parse_mix(options["mix"]),
+                clients=options["clients"],
+                duration=options["duration"],
+                hot_sessions=options["hot_sessions"],
+                timeout=options["timeout"],
+            )
+            result = test.run()
+        except (RuntimeError, ValueError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+        if not options["url"]:
+            result["server"] = options["server"]
+
+        self.stdout.write(f"Всего: {result['total_requests']} запросов, {result['rps']} rps")
+        for name, stats in result["endpoints"].items():
+            self.stdout.write(
+                f"  {name:<8} {stats['requests']:>7}  {stats['rps']:>8} rps  "
+                f"p50 {stats['p50_ms']} / p95 {stats['p95_ms']} / p99 {stats['p99_ms']} мс  "
+                f"ошибки {stats['error_rate']:.2%}  конфликты {stats['conflict_rate']:.2%}  "
+                f"блокировки {stats['lock_timeout_rate']:.2%}"
+            )
+        if result["login_failures"]:
+            self.stdout.write(self.style.WARNING(f"Клиентов, не сумевших войти: {result['login_failures']}"))
+        if test.tickets_deleted:
+            self.stdout.write(f"Удалено тестовых билетов: {test.tickets_deleted}")
+        if options["output"]:
+            loadtest.dump(result, options["output"])
+            self.stdout.write(self.style.SUCCESS(f"Результаты: {options['output']}"))
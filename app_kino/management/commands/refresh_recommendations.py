@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from app_kino import recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации по избранному (только затронутые строки, если не указан --full)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Пересчитать все строки.")
+        parser.add_argument("--top-k", type=int, default=recommendations.TOP_K, help="Соседей на фильм.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, full, top_k, batch_size, **options):
+        count = recommendations.refresh(full=full, top_k=top_k, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано строк: {count}"))
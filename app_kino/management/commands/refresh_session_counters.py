@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app_kino import counters
+
+
+class Command(BaseCommand):
+    help = "Поправляет счётчики будущих сеансов у фильмов, чьи сеансы ушли в прошлое (--full — у всех)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Пересчитать все фильмы.")
+        parser.add_argument("--batch-size", type=int, default=counters.BATCH_SIZE)
+
+    def handle(self, *args, full, batch_size, **options):
+        if full:
+            count = counters.refresh(batch_size=batch_size)
+        else:
+            count = counters.refresh_stale(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Обновлено фильмов: {count}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app_kino import warmup
+
+
+class Command(BaseCommand):
+    help = "Прогревает процесс: URL, шаблоны, статика, справочники, страницы top-N фильмов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=warmup.TOP_N, help="Сколько страниц фильмов отрендерить.")
+
+    def handle(self, *args, top, **options):
+        total = 0.0
+        for name, count, seconds in warmup.run(top):
+            total += seconds
+            self.stdout.write(f"  {name:<10} {count:>6}  {seconds * 1000:8.1f} мс")
+        self.stdout.write(self.style.SUCCESS(f"Прогрев завершён за {total * 1000:.1f} мс"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0006_movie_created_at_movie_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieNeighbors',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbors', serialize=False, to='app_kino.movie', verbose_name='Фильм')),
+                ('items', models.JSONField(default=list, verbose_name='Похожие фильмы (id, вес)')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Пересчитано')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации к фильму',
+                'verbose_name_plural': 'Рекомендации к фильмам',
+            },
+        ),
+        migrations.CreateModel(
+            name='Watermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Ключ')),
+                ('value', models.DateTimeField(verbose_name='Отметка')),
+            ],
+            options={
+                'verbose_name': 'Отметка обработки',
+                'verbose_name_plural': 'Отметки обработки',
+            },
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Добавлено'),
+        ),
+    ]
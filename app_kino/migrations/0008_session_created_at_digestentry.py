@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+# сеансы, созданные до появления поля, не должны попасть в первый дайджест
+BEFORE_TRACKING = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def backfill_created_at(apps, schema_editor):
+    Session = apps.get_model('app_kino', 'Session')
+    Session.objects.update(created_at=BEFORE_TRACKING)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0007_movieneighbors_watermark_favorite_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Создано'),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='DigestEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sessions', models.JSONField(default=list, verbose_name='Сеансы (id)')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Создано')),
+                ('is_sent', models.BooleanField(db_index=True, default=False, verbose_name='Отправлено')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digests', to='app_kino.user', verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Дайджест',
+                'verbose_name_plural': 'Дайджесты',
+            },
+        ),
+    ]
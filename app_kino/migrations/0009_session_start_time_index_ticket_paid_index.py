@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0008_session_created_at_digestentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='start_time',
+            field=models.DateTimeField(db_index=True, verbose_name='Время начала'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['is_paid', '-id'], name='ticket_paid_id_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:34
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def fill_counters(apps, schema_editor):
+    Movie = apps.get_model('app_kino', 'Movie')
+    Session = apps.get_model('app_kino', 'Session')
+    rows = (
+        Session.objects
+        .filter(start_time__gte=timezone.now())
+        .order_by()
+        .values('movie_id')
+        .annotate(n=Count('id'), next_at=Min('start_time'), min_price=Min('price'))
+    )
+    for row in rows:
+        Movie.objects.filter(pk=row['movie_id']).update(
+            upcoming_sessions=row['n'],
+            next_session_at=row['next_at'],
+            min_upcoming_price=row['min_price'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0009_session_start_time_index_ticket_paid_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='min_upcoming_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Мин. цена'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='next_session_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Ближайший сеанс'),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='upcoming_sessions',
+            field=models.PositiveIntegerField(default=0, verbose_name='Сеансов впереди'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-upcoming_sessions', 'title'], name='movie_upcoming_title_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
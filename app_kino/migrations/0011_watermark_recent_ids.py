@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0010_movie_upcoming_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='watermark',
+            name='recent_ids',
+            field=models.JSONField(blank=True, default=list, verbose_name='Обработанные id в окне нахлёста'),
+        ),
+    ]
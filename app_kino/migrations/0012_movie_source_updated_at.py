@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_kino', '0011_watermark_recent_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='source_updated_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Обновлено в источнике'),
+        ),
+    ]
@@ -39,14 +39,34 @@ class Movie(models.Model):
     genres = models.ManyToManyField(Genre, verbose_name="Жанры", related_name="movies")
     created_at = models.DateTimeField("Создано", auto_now_add=True)
     updated_at = models.DateTimeField("Обновлено", auto_now=True)
+    # updated_at записи фида дистрибьютора, см. app_kino.catalog_import
+    source_updated_at = models.DateTimeField("Обновлено в источнике", null=True, blank=True)
+    # денормализованные счётчики будущих сеансов, см. app_kino.counters
+    upcoming_sessions = models.PositiveIntegerField("Сеансов впереди", default=0)
+    next_session_at = models.DateTimeField("Ближайший сеанс", null=True, blank=True, db_index=True)
+    min_upcoming_price = models.DecimalField("Мин. цена", max_digits=6, decimal_places=2, null=True, blank=True)
+
+    COUNTER_FIELDS = ("upcoming_sessions", "next_session_at", "min_upcoming_price")
 
     class Meta:
         verbose_name = "Фильм"
         verbose_name_plural = "Фильмы"
+        indexes = [models.Index(fields=["-upcoming_sessions", "title"], name="movie_upcoming_title_idx")]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # счётчики пишет только app_kino.counters; полное сохранение
+        # загруженного фильма (форма, админка) не должно их затирать
+        if not self._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in deferred and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Cinema(models.Model):
     name = models.CharField("Название", max_length=200)
@@ -77,7 +97,7 @@ class Hall(models.Model):
 class Favorite(models.Model):  # NEW
     user = models.ForeignKey("User", on_delete=models.CASCADE, verbose_name="Пользователь")
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE, verbose_name="Фильм")
-    created_at = models.DateTimeField("Добавлено", default=timezone.now)
+    created_at = models.DateTimeField("Добавлено", default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = "Избранное"
@@ -88,6 +108,38 @@ class Favorite(models.Model):  # NEW
         return f"{self.user} → {self.movie}"
 
 
+class MovieNeighbors(models.Model):
+    movie = models.OneToOneField(
+        Movie, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="neighbors",
+        verbose_name="Фильм"
+    )
+    items = models.JSONField("Похожие фильмы (id, вес)", default=list)
+    computed_at = models.DateTimeField("Пересчитано", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Рекомендации к фильму"
+        verbose_name_plural = "Рекомендации к фильмам"
+
+    def __str__(self):
+        return f"{self.movie}: {len(self.items)}"
+
+
+class Watermark(models.Model):
+    key = models.CharField("Ключ", max_length=100, unique=True)
+    value = models.DateTimeField("Отметка")
+    # id, уже обработанные в окне нахлёста перед отметкой (см. app_kino.digests)
+    recent_ids = models.JSONField("Обработанные id в окне нахлёста", default=list, blank=True)
+
+    class Meta:
+        verbose_name = "Отметка обработки"
+        verbose_name_plural = "Отметки обработки"
+
+    def __str__(self):
+        return f"{self.key}: {self.value:%d.%m.%Y %H:%M}"
+
+
 class Session(models.Model):
     movie = models.ForeignKey(
         Movie, on_delete=models.CASCADE,
@@ -106,8 +158,9 @@ class Session(models.Model):
         verbose_name="Кинотеатр",
         null=True, blank=True,
     )
-    start_time = models.DateTimeField("Время начала")
+    start_time = models.DateTimeField("Время начала", db_index=True)
     price = models.DecimalField("Цена", max_digits=6, decimal_places=2)
+    created_at = models.DateTimeField("Создано", default=timezone.now, db_index=True)
 
     class Meta:
         verbose_name = "Сеанс"
@@ -143,6 +196,21 @@ class Ticket(models.Model):
         verbose_name = "Билет"
         verbose_name_plural = "Билеты"
         unique_together = ("session", "seat_number")
+        indexes = [models.Index(fields=["is_paid", "-id"], name="ticket_paid_id_idx")]
 
     def __str__(self):
         return f"Билет {self.session} — место {self.seat_number}"
+
+
+class DigestEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="digests", verbose_name="Пользователь")
+    sessions = models.JSONField("Сеансы (id)", default=list)
+    created_at = models.DateTimeField("Создано", default=timezone.now)
+    is_sent = models.BooleanField("Отправлено", default=False, db_index=True)
+
+    class Meta:
+        verbose_name = "Дайджест"
+        verbose_name_plural = "Дайджесты"
+
+    def __str__(self):
+        return f"{self.user}: {len(self.sessions)} сеанс(ов)"
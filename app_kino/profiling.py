@@ -0,0 +1,181 @@
+"""
+Выборочное профилирование запросов в продакшене.
+
+ProfilingMiddleware профилирует каждый N-й запрос (PROFILING_SAMPLE_RATE)
+и запросы с подписанным заголовком X-Profile (токен живёт
+PROFILING_TOKEN_MAX_AGE секунд и может быть привязан к пользователю). Во время запроса отдельный
+поток снимает стек рабочего потока каждые PROFILING_INTERVAL секунд;
+свёрнутые стеки («a;b;c count») складываются в PROFILING_DIR/<view>/,
+где хранятся последние PROFILING_KEEP профилей на представление.
+Команда dump_profiles собирает их для flame graph.
+
+Для непрофилируемого запроса цена — инкремент счётчика и чтение заголовка.
+"""
+import itertools
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+
+HEADER = "HTTP_X_PROFILE"
+SALT = "app_kino.profiling"
+TOKEN_PREFIX = "profile"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profiles_dir() -> Path:
+    return Path(_setting("PROFILING_DIR", settings.BASE_DIR / "profiles"))
+
+
+def make_token(username: str = "") -> str:
+    """
+    Значение заголовка X-Profile, включающее профилирование запроса.
+    Токен истекает через PROFILING_TOKEN_MAX_AGE секунд; с username
+    действует только для запросов этого пользователя.
+    """
+    value = f"{TOKEN_PREFIX}:{secrets.token_urlsafe(8)}:{username}"
+    return signing.TimestampSigner(salt=SALT).sign(value)
+
+
+def _has_valid_token(request) -> bool:
+    value = request.META.get(HEADER)
+    if not value:
+        return False
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=_setting("PROFILING_TOKEN_MAX_AGE", 600)
+        )
+    except (signing.BadSignature, ValueError):
+        return False
+    prefix, _, rest = value.partition(":")
+    username = rest.partition(":")[2]
+    if prefix != TOKEN_PREFIX:
+        return False
+    if username:
+        user = getattr(request, "user", None)
+        return user is not None and user.is_authenticated and user.get_username() == username
+    return True
+
+
+class StackSampler:
+    """Снимает стек заданного потока через sys._current_frames() с фиксированным интервалом."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack and not self._stop.is_set():
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+
+
+def store(view_name: str, stacks: Counter, elapsed: float):
+    """Сохраняет свёрнутые стеки профиля и удаляет старые сверх PROFILING_KEEP."""
+    if not stacks:
+        return
+    directory = profiles_dir() / (view_name or "unresolved").replace(":", ".")
+    directory.mkdir(parents=True, exist_ok=True)
+
+    name = f"{time.time_ns()}-{os.getpid()}-{int(elapsed * 1000)}ms.folded"
+    with open(directory / name, "w", encoding="utf-8") as fh:
+        for stack, count in stacks.items():
+            fh.write(f"{stack} {count}\n")
+
+    keep = _setting("PROFILING_KEEP", 50)
+    files = sorted(directory.glob("*.folded"))
+    for old in files[:-keep]:
+        old.unlink(missing_ok=True)
+
+
+def load(view_name: str | None = None) -> dict[str, Counter]:
+    """view_name -> суммарные свёрнутые стеки по сохранённым профилям."""
+    root = profiles_dir()
+    result = {}
+    if not root.is_dir():
+        return result
+    for directory in sorted(p for p in root.iterdir() if p.is_dir()):
+        if view_name and directory.name != view_name.replace(":", "."):
+            continue
+        stacks = Counter()
+        for path in directory.glob("*.folded"):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack and count.isdigit():
+                        stacks[stack] += int(count)
+        result[directory.name] = stacks
+    return result
+
+
+def hot_functions(stacks: Counter, limit: int = 10) -> list[tuple[str, int]]:
+    """Самые частые функции на вершине стека."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rpartition(";")[2]] += count
+    return leaves.most_common(limit)
+
+
+def _profiled(request, call):
+    started = time.perf_counter()
+    with StackSampler(_setting("PROFILING_INTERVAL", 0.005)) as sampler:
+        response = call()
+    match = getattr(request, "resolver_match", None)
+    store(match.view_name if match else "", sampler.stacks, time.perf_counter() - started)
+    return response
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rate = _setting("PROFILING_SAMPLE_RATE", 0)
+        self.counter = itertools.count(1)
+
+    def __call__(self, request):
+        sampled = self.rate and next(self.counter) % self.rate == 0
+        if sampled or _has_valid_token(request):
+            return _profiled(request, lambda: self.get_response(request))
+        return self.get_response(request)
+
+
+def profile_view(view_func):
+    """Профилирует представление по тем же правилам без подключения middleware."""
+    rate = _setting("PROFILING_SAMPLE_RATE", 0)
+    counter = itertools.count(1)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        sampled = rate and next(counter) % rate == 0
+        if sampled or _has_valid_token(request):
+            return _profiled(request, lambda: view_func(request, *args, **kwargs))
+        return view_func(request, *args, **kwargs)
+
+    return wrapper
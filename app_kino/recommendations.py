@@ -0,0 +1,156 @@
+"""
+Рекомендации «вам может понравиться» по избранному (item-item).
+
+Матрица совместной встречаемости фильмов в избранном считается офлайн
+(команда refresh_recommendations) как разреженная: строка фильма — Counter
+по соседям. Для каждого фильма хранится top-k соседей с косинусным весом
+c(i, j) / sqrt(n_i * n_j) в MovieNeighbors. При показе строки избранных
+фильмов пользователя достаются одним запросом и складываются.
+
+Инкрементальный пересчёт затрагивает не только корзины новых
+пользователей: новое избранное меняет популярность n_X, а с ней вес
+в каждой строке, где встречается X. Поэтому пересчитываются строки всех
+фильмов, встречающихся вместе с новыми избранными. created_at ставится
+при создании объекта, а не при коммите, поэтому окно читается
+с нахлёстом OVERLAP — повторный пересчёт строки ничего не портит.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Favorite, Movie, MovieNeighbors, Watermark
+
+WATERMARK_KEY = "recommendations"
+TOP_K = 20
+OVERLAP = timedelta(minutes=10)
+
+
+def _affected_movies(since, until):
+    """
+    Фильмы, чьи строки меняются из-за избранного, добавленного в (since, until]:
+    все фильмы из корзин пользователей, у которых есть хоть один новый избранный фильм
+    (туда входят и корзины новых пользователей, и все строки с изменившимся n_X).
+    """
+    new_movies = (
+        Favorite.objects
+        .filter(created_at__gt=since, created_at__lte=until)
+        .values("movie_id")
+    )
+    fans = Favorite.objects.filter(movie_id__in=new_movies).values("user_id")
+    return set(
+        Favorite.objects
+        .filter(user_id__in=fans)
+        .values_list("movie_id", flat=True)
+        .distinct()
+    )
+
+
+def _baskets(affected):
+    """user_id -> [movie_id, ...] для всех, кто добавил в избранное хотя бы один затронутый фильм."""
+    favorites = Favorite.objects.all()
+    if affected is not None:
+        users = Favorite.objects.filter(movie_id__in=affected).values("user_id")
+        favorites = favorites.filter(user_id__in=users)
+
+    baskets = defaultdict(list)
+    for user_id, movie_id in favorites.values_list("user_id", "movie_id").iterator(chunk_size=5000):
+        baskets[user_id].append(movie_id)
+    return baskets
+
+
+def compute_rows(affected=None, top_k=TOP_K):
+    """
+    Пересчитывает строки матрицы для affected (None — для всех фильмов).
+    Возвращает {movie_id: [[neighbor_id, score], ...]}.
+    """
+    popularity = dict(
+        Favorite.objects.values("movie_id").annotate(n=Count("id")).values_list("movie_id", "n")
+    )
+
+    cooc = defaultdict(Counter)
+    for basket in _baskets(affected).values():
+        if len(basket) < 2:
+            continue
+        for i in basket:
+            if affected is not None and i not in affected:
+                continue
+            row = cooc[i]
+            row.update(basket)
+
+    rows = {}
+    for i, row in cooc.items():
+        n_i = popularity.get(i, 0)
+        scored = (
+            (j, c / math.sqrt(n_i * popularity[j]))
+            for j, c in row.items()
+            if j != i and c > 0 and popularity.get(j)
+        )
+        top = heapq.nlargest(top_k, scored, key=lambda item: item[1])
+        if top:
+            rows[i] = [[j, round(score, 6)] for j, score in top]
+    return rows
+
+
+def refresh(full=False, top_k=TOP_K, batch_size=1000):
+    """
+    Обновляет MovieNeighbors. Без full пересчитываются только строки фильмов,
+    затронутых избранным, добавленным после прошлого запуска; удаления
+    из избранного учитываются только при полном пересчёте.
+    Возвращает число пересчитанных строк.
+    """
+    now = timezone.now()
+    watermark = Watermark.objects.filter(key=WATERMARK_KEY).first()
+
+    affected = None
+    if not full and watermark is not None:
+        affected = _affected_movies(watermark.value - OVERLAP, now)
+        if not affected:
+            Watermark.objects.filter(pk=watermark.pk).update(value=now)
+            return 0
+
+    rows = compute_rows(affected, top_k=top_k)
+    objs = [MovieNeighbors(movie_id=movie_id, items=items, computed_at=now) for movie_id, items in rows.items()]
+
+    with transaction.atomic():
+        stale = MovieNeighbors.objects.exclude(movie_id__in=list(rows))
+        if affected is not None:
+            stale = stale.filter(movie_id__in=list(affected))
+        stale.delete()
+
+        MovieNeighbors.objects.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["movie"],
+            update_fields=["items", "computed_at"],
+        )
+        Watermark.objects.update_or_create(key=WATERMARK_KEY, defaults={"value": now})
+
+    return len(affected) if affected is not None else len(rows)
+
+
+def recommend_for(username: str, limit: int = 4) -> list[Movie]:
+    """Рекомендации пользователю: сумма top-k строк по его избранному."""
+    rows = (
+        MovieNeighbors.objects
+        .filter(movie__favorite__user__username=username)
+        .values_list("movie_id", "items")
+    )
+
+    favorites = set()
+    scores = Counter()
+    for movie_id, items in rows:
+        favorites.add(movie_id)
+        for neighbor_id, score in items:
+            scores[neighbor_id] += score
+
+    ids = [movie_id for movie_id, _ in scores.most_common() if movie_id not in favorites][:limit]
+    if not ids:
+        return []
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[pk] for pk in ids if pk in movies]
@@ -0,0 +1,116 @@
+"""
+Процессный кэш справочников: жанры, кинотеатры, залы.
+
+Таблицы маленькие и меняются редко, поэтому целиком держатся в памяти
+в виде компактных записей со __slots__. Актуальность проверяется по общей
+отметке версии (versioning.SharedVersion), которую обновляют сигналы
+save/delete этих моделей.
+"""
+from threading import Lock
+
+from django.db.models.signals import post_delete, post_save
+
+from .models import Cinema, Genre, Hall
+from .versioning import SharedVersion
+
+
+class GenreRef:
+    __slots__ = ("pk", "name")
+
+    def __init__(self, pk, name):
+        self.pk = pk
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class CinemaRef:
+    __slots__ = ("pk", "name", "address", "phone")
+
+    def __init__(self, pk, name, address, phone):
+        self.pk = pk
+        self.name = name
+        self.address = address
+        self.phone = phone
+
+    @property
+    def id(self):
+        return self.pk
+
+    def __str__(self):
+        return self.name
+
+
+class HallRef:
+    __slots__ = ("pk", "name", "seats", "cinema_id", "cinema")
+
+    def __init__(self, pk, name, seats, cinema_id, cinema):
+        self.pk = pk
+        self.name = name
+        self.seats = seats
+        self.cinema_id = cinema_id
+        self.cinema = cinema
+
+    def __str__(self):
+        return f"{self.cinema} — {self.name}"
+
+
+class RefData:
+    __slots__ = ("version", "genres", "genres_sorted", "cinemas", "cinemas_sorted", "halls")
+
+    def __init__(self, version):
+        self.version = version
+        self.genres = {
+            pk: GenreRef(pk, name)
+            for pk, name in Genre.objects.values_list("pk", "name")
+        }
+        self.genres_sorted = sorted(self.genres.values(), key=lambda g: g.name.casefold())
+        self.cinemas = {
+            pk: CinemaRef(pk, name, address, phone)
+            for pk, name, address, phone in Cinema.objects.values_list("pk", "name", "address", "phone")
+        }
+        self.cinemas_sorted = sorted(self.cinemas.values(), key=lambda c: c.name)
+        self.halls = {
+            pk: HallRef(pk, name, seats, cinema_id, self.cinemas.get(cinema_id))
+            for pk, name, seats, cinema_id in Hall.objects.values_list("pk", "name", "seats", "cinema_id")
+        }
+
+
+version = SharedVersion("app_kino:refdata")
+_data = None
+_lock = Lock()
+
+
+def get() -> RefData:
+    global _data
+    current = version.current()
+    data = _data
+    if data is None or data.version != current:
+        with _lock:
+            if _data is None or _data.version != current:
+                _data = RefData(current)
+            data = _data
+    return data
+
+
+def genre(pk):
+    return get().genres.get(pk)
+
+
+def cinema(pk):
+    return get().cinemas.get(pk)
+
+
+def hall(pk):
+    return get().halls.get(pk)
+
+
+def invalidate(**kwargs):
+    version.bump()
+
+
+def connect_signals():
+    for model in (Genre, Cinema, Hall):
+        post_save.connect(invalidate, sender=model, dispatch_uid=f"refdata_{model.__name__}_save")
+        post_delete.connect(invalidate, sender=model, dispatch_uid=f"refdata_{model.__name__}_delete")
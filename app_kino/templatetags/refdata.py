@@ -0,0 +1,23 @@
+from django import template
+
+from app_kino import refdata
+
+register = template.Library()
+
+
+@register.filter
+def genre(pk):
+    """Жанр по id из процессного кэша справочников."""
+    return refdata.genre(pk)
+
+
+@register.filter
+def cinema(pk):
+    """Кинотеатр по id из процессного кэша справочников."""
+    return refdata.cinema(pk)
+
+
+@register.filter
+def hall(pk):
+    """Зал (с кинотеатром) по id из процессного кэша справочников."""
+    return refdata.hall(pk)
@@ -1,3 +1,651 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import tempfile
+import time
+import warnings
+import zlib
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.models import User as AuthUser
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from .catalog_import import CatalogImporter
+from . import digests, facets, profiling, recommendations
+from .admin import EstimatedCountPaginator
+from .compression import CompressionMiddleware, _gzip_stream, _may_carry_secrets
+from .facets import FacetIndex
+from .models import (Cinema, DigestEntry, Favorite, Genre, Hall, Movie, MovieNeighbors, Session, Ticket,
+                     User, Watermark)
+from .versioning import SharedVersion
+
+
+class FacetIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.drama = Genre.objects.create(name="Драма")
+        cls.comedy = Genre.objects.create(name="Комедия")
+
+        def movie(title, country, rating, year, *genres):
+            m = Movie.objects.create(title=title, duration=90, country=country,
+                                     age_rating=rating, release_date=date(year, 1, 1))
+            m.genres.set(genres)
+            return m
+
+        cls.a = movie("А", "Россия", "12+", 2020, cls.drama)
+        cls.b = movie("Б", "Россия", "16+", 2021, cls.drama, cls.comedy)
+        cls.c = movie("В", "США", "12+", 2021, cls.comedy)
+
+    def counts(self, counts, facet):
+        return {value: count for value, _, count, _ in counts[facet]}
+
+    def test_no_filter_selects_everything(self):
+        index = FacetIndex.build()
+        mask, counts = index.select({})
+        self.assertEqual(mask.bit_count(), 3)
+        self.assertEqual(index.ids_for(mask), [self.a.pk, self.b.pk, self.c.pk])
+        self.assertEqual(self.counts(counts, "country"), {"Россия": 2, "США": 1})
+        self.assertEqual(self.counts(counts, "genre"), {str(self.drama.pk): 2, str(self.comedy.pk): 2})
+
+    def test_values_or_within_facet_and_between_facets(self):
+        index = FacetIndex.build()
+        mask, _ = index.select({"year": ["2020", "2021"], "country": ["Россия"]})
+        self.assertEqual(index.ids_for(mask), [self.a.pk, self.b.pk])
+        mask, _ = index.select({"genre": [str(self.comedy.pk)], "age_rating": ["12+"]})
+        self.assertEqual(index.ids_for(mask), [self.c.pk])
+
+    def test_counts_ignore_own_facet_selection(self):
+        index = FacetIndex.build()
+        _, counts = index.select({"country": ["Россия"]})
+        # в своём фасете видны и невыбранные значения, остальные сужены выбором
+        self.assertEqual(self.counts(counts, "country"), {"Россия": 2, "США": 1})
+        self.assertEqual(self.counts(counts, "age_rating"), {"12+": 1, "16+": 1})
+        self.assertEqual(self.counts(counts, "genre"), {str(self.drama.pk): 2, str(self.comedy.pk): 1})
+
+    def test_unknown_value_selects_nothing(self):
+        index = FacetIndex.build()
+        mask, _ = index.select({"country": ["Франция"]})
+        self.assertEqual(mask, 0)
+        self.assertEqual(index.ids_for(mask), [])
+
+    def test_movie_detail_does_not_build_index(self):
+        with mock.patch.object(facets.FacetIndex, "build") as build:
+            response = self.client.get(reverse("app_kino:movie_detail", args=[self.b.pk]))
+        build.assert_not_called()
+        self.assertEqual([g.name for g in response.context["genres"]], ["Драма", "Комедия"])
+
+    def test_genre_ids(self):
+        index = FacetIndex.build()
+        self.assertEqual(sorted(index.genre_ids(self.b.pk)), sorted([self.drama.pk, self.comedy.pk]))
+        self.assertEqual(index.genre_ids(0), [])
+
+
+class SharedVersionTests(TestCase):
+    key = "app_kino:tests:version"
+
+    def setUp(self):
+        cache.delete(self.key)
+        self.addCleanup(cache.delete, self.key)
+
+    def test_bump_is_published_after_commit(self):
+        version = SharedVersion(self.key, check_interval=0)
+        before = version.current()
+        with self.captureOnCommitCallbacks(execute=True):
+            version.bump()
+            self.assertEqual(version.current(), before)
+        self.assertNotEqual(version.current(), before)
+        self.assertEqual(SharedVersion(self.key).current(), version.current())
+
+    def test_lost_key_gets_a_new_value(self):
+        version = SharedVersion(self.key, check_interval=0)
+        before = version.current()
+        cache.delete(self.key)
+        self.assertNotEqual(version.current(), before)
+
+
+class CatalogImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.drama = Genre.objects.create(name="Драма")
+        cls.movie = Movie.objects.create(title="Начало", original_title="Inception", duration=148,
+                                         country="США", release_date=date(2010, 7, 8))
+        cls.movie.genres.set([cls.drama])
+
+    def row(self, **values):
+        row = {"title": "Начало", "original_title": "Inception", "duration": 148,
+               "country": "США", "release_date": "2010-07-08", "genres": ["Драма"]}
+        row.update(values)
+        return row
+
+    def run_import(self, rows, batch_size=1000):
+        return CatalogImporter(batch_size=batch_size).run(enumerate(rows, 1))
+
+    def test_existing_movie_matched_by_normalized_original_title_and_date(self):
+        stats = self.run_import([self.row(original_title="  inception ", duration=150)])
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        self.assertEqual(Movie.objects.count(), 1)
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.duration, 150)
+
+    def test_same_title_other_date_is_another_movie(self):
+        stats = self.run_import([self.row(release_date="2030-01-01")])
+        self.assertEqual(stats.created, 1)
+        self.assertEqual(Movie.objects.filter(original_title="Inception").count(), 2)
+
+    def test_duplicates_within_feed_collapse(self):
+        stats = self.run_import([self.row(title="Дюна", original_title="Dune", release_date="2021-09-16"),
+                                 self.row(title="Дюна", original_title="DUNE", release_date="2021-09-16")])
+        self.assertEqual(stats.created, 1)
+
+    def test_feed_updated_at_is_compared_with_previous_feed(self):
+        feed_time = timezone.now() - timedelta(days=2)
+        self.run_import([self.row(duration=120, updated_at=feed_time.isoformat())])
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.duration, self.movie.source_updated_at), (120, feed_time))
+
+        stats = self.run_import([self.row(duration=10, updated_at=(feed_time - timedelta(hours=1)).isoformat())])
+        self.assertEqual((stats.updated, stats.unchanged), (0, 1))
+
+        # правка у дистрибьютора раньше нашего импорта, но позже прошлой отметки фида
+        between = feed_time + timedelta(hours=1)
+        self.assertLess(between, self.movie.updated_at)
+        stats = self.run_import([self.row(duration=10, updated_at=between.isoformat())])
+        self.assertEqual(stats.updated, 1)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.duration, self.movie.source_updated_at), (10, between))
+
+    def test_local_edits_do_not_move_feed_cutoff(self):
+        feed_time = timezone.now() - timedelta(days=2)
+        self.run_import([self.row(updated_at=feed_time.isoformat())])
+        movie = Movie.objects.get(pk=self.movie.pk)
+        movie.description = "правка в админке"
+        movie.save()
+        stats = self.run_import([self.row(duration=90, updated_at=(feed_time + timedelta(minutes=1)).isoformat())])
+        self.assertEqual(stats.updated, 1)
+
+    def test_genres_created_counts_only_new_rows(self):
+        importer = CatalogImporter()
+        Genre.objects.create(name="Фантастика")  # появился после построения индекса
+        stats = importer.run(enumerate([self.row(genres=["Фантастика", "Боевик"])], 1))
+        self.assertEqual(stats.genres_created, 1)
+        self.assertEqual(Genre.objects.filter(name__in=["Фантастика", "Боевик"]).count(), 2)
+
+    def test_genres_are_rewritten(self):
+        stats = self.run_import([self.row(genres=["Фантастика", "боевик", "Боевик"])])
+        self.assertEqual((stats.updated, stats.genres_created), (1, 2))
+        names = self.movie.genres.values_list("name", flat=True)
+        self.assertEqual(sorted(name.casefold() for name in names), ["боевик", "фантастика"])
+
+    def test_unchanged_movie_is_not_written(self):
+        updated_at = self.movie.updated_at
+        stats = self.run_import([self.row()])
+        self.assertEqual((stats.updated, stats.unchanged), (0, 1))
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.updated_at, updated_at)
+
+    def test_queries_per_batch_do_not_depend_on_batch_size(self):
+        def feed(n, prefix, *genres):
+            return [self.row(title=f"{prefix} {i}", original_title="", genres=["Драма", *genres])
+                    for i in range(n)]
+
+        small = self.run_import(feed(3, "А", "Новый-1"))
+        large = self.run_import(feed(30, "Б", "Новый-2"))
+        self.assertEqual((small.batches, large.batches), (1, 1))
+        self.assertEqual(small.queries, large.queries)
+
+        small = self.run_import([dict(row, duration=100) for row in feed(3, "А", "Новый-1")])
+        large = self.run_import([dict(row, duration=100) for row in feed(30, "Б", "Новый-2")])
+        self.assertEqual((small.updated, large.updated), (3, 30))
+        self.assertEqual(small.queries, large.queries)
+
+        single = self.run_import(feed(10, "В"))
+        batched = self.run_import(feed(30, "Г"), batch_size=10)
+        self.assertEqual(batched.batches, 3)
+        self.assertEqual(batched.queries, 3 * single.queries)
+
+
+class GzipStreamTests(SimpleTestCase):
+    chunks = [b"<html><head>", b"", "карточка фильма ".encode() * 40, b"</html>"]
+
+    def test_stream_is_a_valid_gzip_member(self):
+        data = b"".join(_gzip_stream(iter(self.chunks), 100))
+        self.assertEqual(gzip.decompress(data), b"".join(self.chunks))
+        self.assertEqual(data[:3], b"\x1f\x8b\x08")
+        body = b"".join(self.chunks)
+        self.assertEqual(data[-8:-4], (zlib.crc32(body) & 0xFFFFFFFF).to_bytes(4, "little"))
+        self.assertEqual(data[-4:], len(body).to_bytes(4, "little"))
+
+    def test_random_file_name_in_header(self):
+        headers = set()
+        for _ in range(20):
+            header = next(_gzip_stream(iter(self.chunks), 100))
+            if header[3] & 0x08:
+                self.assertTrue(header.endswith(b"\0"))
+                self.assertTrue(header[10:-1].isalpha())
+            else:
+                self.assertEqual(len(header), 10)
+            headers.add(header)
+        self.assertGreater(len(headers), 1)
+        self.assertEqual(next(_gzip_stream(iter(self.chunks), 0)), b"\x1f\x8b\x08\0\0\0\0\0\x00\xff")
+
+    def test_every_chunk_is_flushed(self):
+        parts = list(_gzip_stream(iter(self.chunks), 10))
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(parts[0]), b"")
+        # пустой кусок пропускается, остальные раскрываются сразу, без конца потока
+        for part, chunk in zip(parts[1:-1], [c for c in self.chunks if c]):
+            self.assertEqual(decompressor.decompress(part), chunk)
+        self.assertEqual(decompressor.decompress(parts[-1]), b"")
+        self.assertTrue(decompressor.eof)
+
+    def test_empty_stream(self):
+        self.assertEqual(gzip.decompress(b"".join(_gzip_stream(iter([]), 10))), b"")
+
+    def test_middleware_compresses_streaming_response(self):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(iter(self.chunks)))
+        response = middleware(request)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), b"".join(self.chunks))
+
+    def test_cookie_dependent_responses_may_carry_secrets(self):
+        self.assertFalse(_may_carry_secrets(HttpResponse("x")))
+        response = HttpResponse("x")
+        response.set_cookie("csrftoken", "secret")
+        self.assertTrue(_may_carry_secrets(response))
+        response = HttpResponse("x")
+        patch_vary_headers(response, ("Cookie",))
+        self.assertTrue(_may_carry_secrets(response))
+
+
+class SessionCountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cinema = Cinema.objects.create(name="Октябрь")
+        cls.hall = Hall.objects.create(cinema=cls.cinema, name="1", seats=10)
+        cls.movie = Movie.objects.create(title="Начало", duration=148)
+
+    def add_sessions(self, n, movie=None):
+        start = timezone.now() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(n):
+                Session.objects.create(movie=movie or self.movie, hall=self.hall, cinema=self.cinema,
+                                       start_time=start + timedelta(hours=i), price=300 + i)
+
+    def test_counters_follow_sessions(self):
+        self.add_sessions(3)
+        self.movie.refresh_from_db()
+        self.assertEqual((self.movie.upcoming_sessions, self.movie.min_upcoming_price), (3, 300))
+
+        other = Movie.objects.create(title="Дюна", duration=155)
+        session = Session.objects.filter(movie=self.movie).order_by("price").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            session.movie = other
+            session.save()
+        self.movie.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.movie.upcoming_sessions, self.movie.min_upcoming_price), (2, 301))
+        self.assertEqual(other.upcoming_sessions, 1)
+
+    def test_cascade_delete_refreshes_once(self):
+        self.add_sessions(20)
+        # сеансы, билеты, зал и один пересчёт (агрегат, фильмы, UPDATE) — вне зависимости от числа сеансов
+        with self.assertNumQueries(7):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.hall.delete()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.upcoming_sessions, 0)
+        self.assertIsNone(self.movie.next_session_at)
+
+    def test_save_of_deferred_movie_touches_only_loaded_fields(self):
+        self.add_sessions(1)
+        movie = Movie.objects.only("title").get(pk=self.movie.pk)
+        movie.title = "Начало (2010)"
+        with self.assertNumQueries(1):
+            movie.save()
+        movie = Movie.objects.get(pk=self.movie.pk)
+        self.assertEqual((movie.title, movie.duration, movie.upcoming_sessions), ("Начало (2010)", 148, 1))
+
+    def test_full_save_keeps_counters(self):
+        self.add_sessions(2)
+        movie = Movie.objects.get(pk=self.movie.pk)
+        stale = Movie.objects.get(pk=self.movie.pk)
+        stale.upcoming_sessions = 0
+        stale.title = "Начало (2010)"
+        stale.save()
+        movie.refresh_from_db()
+        self.assertEqual((movie.title, movie.upcoming_sessions), ("Начало (2010)", 2))
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [Movie.objects.create(title=f"Фильм {i}", duration=90) for i in range(6)]
+        cls.users = [User.objects.create(username=f"u{i}", email=f"u{i}@example.com", password_hash="!")
+                     for i in range(5)]
+
+    def favorite(self, user, *movies):
+        for movie in movies:
+            Favorite.objects.create(user=self.users[user], movie=self.movies[movie])
+
+    def rows(self):
+        return dict(MovieNeighbors.objects.values_list("movie_id", "items"))
+
+    def test_incremental_refresh_matches_full(self):
+        self.favorite(0, 0, 1, 2)
+        self.favorite(1, 0, 1)
+        self.favorite(2, 1, 3)
+        recommendations.refresh()
+
+        # новое избранное меняет n_3 и вес (1, 3) в строке фильма 1, хотя u2 ничего не добавлял
+        self.favorite(3, 3, 4)
+        self.assertGreater(recommendations.refresh(), 0)
+        incremental = self.rows()
+
+        recommendations.refresh(full=True)
+        self.assertEqual(incremental, self.rows())
+
+    def test_recommend_for_sums_rows_and_skips_favorites(self):
+        self.favorite(0, 0, 1, 2)
+        self.favorite(1, 0, 1, 3)
+        self.favorite(2, 0, 4)
+        self.favorite(3, 1, 3)
+        recommendations.refresh(full=True)
+
+        movies = self.movies
+        self.assertEqual(recommendations.recommend_for("u4"), [])
+        self.assertEqual(recommendations.recommend_for("u2", limit=2), [movies[1], movies[2]])
+        self.assertEqual(recommendations.recommend_for("u0"), [movies[3], movies[4]])
+
+
+class DigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cinema = Cinema.objects.create(name="Октябрь")
+        cls.hall = Hall.objects.create(cinema=cls.cinema, name="1", seats=10)
+        cls.dune = Movie.objects.create(title="Дюна", duration=155)
+        cls.matrix = Movie.objects.create(title="Матрица", duration=136)
+        cls.ann = User.objects.create(username="ann", email="ann@example.com", password_hash="!")
+        cls.bob = User.objects.create(username="bob", email="bob@example.com", password_hash="!")
+        Favorite.objects.create(user=cls.ann, movie=cls.dune)
+        Favorite.objects.create(user=cls.ann, movie=cls.matrix)
+        Favorite.objects.create(user=cls.bob, movie=cls.matrix)
+
+    def session(self, movie, created_at=None, days=1):
+        return Session.objects.create(movie=movie, hall=self.hall, cinema=self.cinema, price=300,
+                                      start_time=timezone.now() + timedelta(days=days),
+                                      created_at=created_at or timezone.now())
+
+    def entries(self):
+        return {e.user_id: e.sessions for e in DigestEntry.objects.all()}
+
+    def test_sessions_grouped_per_user(self):
+        dune, matrix = self.session(self.dune), self.session(self.matrix)
+        self.session(self.dune, days=-1)  # уже прошёл
+        self.assertEqual(digests.build(), (2, 2))
+        self.assertEqual(self.entries(), {self.ann.pk: [dune.pk, matrix.pk], self.bob.pk: [matrix.pk]})
+
+    def test_watermark_advances_without_repeats(self):
+        first = self.session(self.matrix)
+        digests.build()
+        watermark = Watermark.objects.get(key=digests.WATERMARK_KEY)
+        self.assertEqual(watermark.recent_ids, [first.pk])
+
+        DigestEntry.objects.all().delete()
+        self.assertEqual(digests.build(), (0, 0))
+        second = self.session(self.matrix)
+        self.assertEqual(digests.build(), (1, 2))
+        self.assertEqual(self.entries(), {self.ann.pk: [second.pk], self.bob.pk: [second.pk]})
+        self.assertGreater(Watermark.objects.get(key=digests.WATERMARK_KEY).value, watermark.value)
+
+    def test_late_commit_inside_overlap_is_not_lost(self):
+        digests.build()
+        # created_at раньше отметки: транзакция закоммитилась уже после прошлого запуска
+        late = self.session(self.dune, created_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(digests.build(), (1, 1))
+        self.assertEqual(self.entries(), {self.ann.pk: [late.pk]})
+
+    def test_jsonl_output(self):
+        session = self.session(self.matrix)
+        output = io.StringIO()
+        digests.build(output=output)
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted((line["user"], line["sessions"]) for line in lines),
+                         [(self.ann.pk, [session.pk]), (self.bob.pk, [session.pk])])
+        self.assertFalse(DigestEntry.objects.exists())
+        self.assertTrue(Watermark.objects.filter(key=digests.WATERMARK_KEY).exists())
+
+
+class ProfilingTests(SimpleTestCase):
+    def request(self, token=None, user=None):
+        headers = {"HTTP_X_PROFILE": token} if token else {}
+        request = RequestFactory().get("/", **headers)
+        request.user = user or AnonymousUser()
+        return request
+
+    def test_token_validation(self):
+        token = profiling.make_token()
+        self.assertTrue(profiling._has_valid_token(self.request(token)))
+        self.assertFalse(profiling._has_valid_token(self.request()))
+        self.assertFalse(profiling._has_valid_token(self.request(token[:-1] + "x")))
+        self.assertFalse(profiling._has_valid_token(self.request(signing.Signer(salt=profiling.SALT).sign("profile"))))
+        self.assertFalse(profiling._has_valid_token(self.request(signing.TimestampSigner().sign("profile:x:"))))
+
+    @override_settings(PROFILING_TOKEN_MAX_AGE=600)
+    def test_token_expires(self):
+        token = profiling.make_token()
+        with mock.patch("time.time", return_value=time.time() + 601):
+            self.assertFalse(profiling._has_valid_token(self.request(token)))
+        with mock.patch("time.time", return_value=time.time() + 599):
+            self.assertTrue(profiling._has_valid_token(self.request(token)))
+
+    def test_token_bound_to_user(self):
+        token = profiling.make_token("ann")
+        self.assertTrue(profiling._has_valid_token(self.request(token, AuthUser(username="ann"))))
+        self.assertFalse(profiling._has_valid_token(self.request(token, AuthUser(username="bob"))))
+        self.assertFalse(profiling._has_valid_token(self.request(token)))
+
+    @override_settings(PROFILING_SAMPLE_RATE=3)
+    def test_every_nth_request_is_profiled(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse("ok"))
+        with mock.patch.object(profiling, "_profiled", side_effect=lambda request, call: call()) as profiled:
+            for _ in range(7):
+                middleware(self.request())
+            self.assertEqual(profiled.call_count, 2)
+            middleware(self.request(profiling.make_token()))
+            self.assertEqual(profiled.call_count, 3)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_sampling_disabled(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse("ok"))
+        with mock.patch.object(profiling, "_profiled") as profiled:
+            for _ in range(5):
+                middleware(self.request())
+        profiled.assert_not_called()
+
+    def test_store_keeps_latest_profiles(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(PROFILING_DIR=tmp, PROFILING_KEEP=3):
+            for i in range(5):
+                profiling.store("app_kino:movie_list", Counter({f"views.py:movie_list;f{i}": i + 1}), 0.01)
+            profiling.store("app_kino:movie_list", Counter(), 0.01)
+            files = sorted(Path(tmp, "app_kino.movie_list").glob("*.folded"))
+            self.assertEqual(len(files), 3)
+            stacks = profiling.load("app_kino:movie_list")["app_kino.movie_list"]
+            self.assertEqual(stacks, Counter({"views.py:movie_list;f2": 3, "views.py:movie_list;f3": 4,
+                                              "views.py:movie_list;f4": 5}))
+            self.assertEqual(profiling.hot_functions(stacks, 1), [("f4", 5)])
+
+
+class SessionBuyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cinema = Cinema.objects.create(name="Октябрь")
+        hall = Hall.objects.create(cinema=cinema, name="1", seats=2)
+        movie = Movie.objects.create(title="Дюна", duration=155)
+        cls.session = Session.objects.create(movie=movie, hall=hall, cinema=cinema, price=300,
+                                             start_time=timezone.now() + timedelta(days=1))
+        cls.url = reverse("app_kino:session_buy", args=[cls.session.pk])
+        cls.account = AuthUser.objects.create_user("ann", "shared@example.com", "secret")
+
+    def test_login_required(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("login"), response.url)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_ticket_belongs_to_buyer(self):
+        self.client.force_login(self.account)
+        self.assertEqual(self.client.post(self.url).status_code, 302)
+        self.assertEqual(self.client.post(self.url).status_code, 302)
+        self.assertEqual(self.client.post(self.url).status_code, 409)
+
+        buyer = User.objects.get(username="ann")
+        self.assertEqual(buyer.email, "shared@example.com")
+        self.assertTrue(buyer.password_hash.startswith("!"))
+        self.assertNotEqual(buyer.password_hash, self.account.password)
+        self.assertEqual(list(Ticket.objects.values_list("user_id", "seat_number")), [(buyer.pk, 1), (buyer.pk, 2)])
+
+    def test_taken_email_falls_back_to_placeholder(self):
+        User.objects.create(username="other", email="shared@example.com", password_hash="!")
+        self.client.force_login(self.account)
+        self.assertEqual(self.client.post(self.url).status_code, 302)
+        buyer = User.objects.get(username="ann")
+        self.assertEqual(buyer.email, "ann@users.invalid")
+        self.assertEqual(Ticket.objects.get().user, buyer)
+
+
+class AdminScalingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = AuthUser.objects.create_superuser("admin", "admin@example.com", "secret")
+        movie = Movie.objects.create(title="Дюна", duration=155)
+        start = timezone.now() + timedelta(days=1)
+        for c in range(3):
+            cinema = Cinema.objects.create(name=f"Кинотеатр {c}")
+            for h in range(3):
+                hall = Hall.objects.create(cinema=cinema, name=f"Зал {h}", seats=10)
+                Session.objects.create(movie=movie, hall=hall, cinema=cinema, price=300,
+                                       start_time=start + timedelta(hours=c * 3 + h))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def autocomplete(self, model_name, field_name):
+        response = self.client.get("/admin/autocomplete/", {
+            "app_label": "app_kino", "model_name": model_name, "field_name": field_name, "term": "",
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def assert_constant_queries(self, model_name, field_name, add):
+        with CaptureQueriesContext(connection) as before:
+            results = self.autocomplete(model_name, field_name)
+        add()
+        with CaptureQueriesContext(connection) as after:
+            more = self.autocomplete(model_name, field_name)
+        self.assertGreater(len(more), len(results))
+        self.assertEqual(len(after), len(before))
+
+    def test_hall_autocomplete_queries_do_not_grow(self):
+        cinema = Cinema.objects.create(name="Новый")
+        self.assert_constant_queries("session", "hall", lambda: [
+            Hall.objects.create(cinema=cinema, name=f"Зал {i}", seats=10) for i in range(5)
+        ])
+
+    def test_session_autocomplete_queries_do_not_grow(self):
+        hall = Hall.objects.select_related("cinema").first()
+
+        def add():
+            for i in range(5):
+                movie = Movie.objects.create(title=f"Фильм {i}", duration=90)
+                Session.objects.create(movie=movie, hall=hall, cinema=hall.cinema, price=300,
+                                       start_time=timezone.now() + timedelta(days=2, hours=i))
+
+        self.assert_constant_queries("ticket", "session", add)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Movie.objects.bulk_create([Movie(title=f"Фильм {i:02}", duration=90) for i in range(30)])
+
+    def paginator(self, page=1, limit=10, ahead=1):
+        paginator = EstimatedCountPaginator(Movie.objects.order_by("title"), 2, requested_page=page)
+        paginator.COUNT_LIMIT = limit
+        paginator.PAGES_AHEAD = ahead
+        return paginator
+
+    def test_exact_count_below_limit(self):
+        paginator = self.paginator(limit=100)
+        self.assertEqual(paginator.count, 30)
+        self.assertFalse(paginator.is_estimate)
+
+    def test_capped_count_is_marked_as_estimate(self):
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, 10)
+        self.assertTrue(paginator.is_estimate)
+
+    def test_window_follows_requested_page(self):
+        paginator = self.paginator(page=12)
+        self.assertEqual(paginator.count, 26)
+        self.assertTrue(paginator.is_estimate)
+        self.assertEqual(paginator.page(12).object_list[0].title, "Фильм 22")
+        paginator = self.paginator(page=15)
+        self.assertEqual(paginator.count, 30)
+        self.assertFalse(paginator.is_estimate)
+
+    def test_changelist_pages_past_limit(self):
+        cinema = Cinema.objects.create(name="Октябрь")
+        hall = Hall.objects.create(cinema=cinema, name="1", seats=10)
+        movie = Movie.objects.first()
+        Session.objects.bulk_create([
+            Session(movie=movie, hall=hall, cinema=cinema, price=300, start_time=timezone.now() + timedelta(hours=i))
+            for i in range(10)
+        ])
+        self.client.force_login(AuthUser.objects.create_superuser("admin", "admin@example.com", "secret"))
+        with mock.patch.object(EstimatedCountPaginator, "COUNT_LIMIT", 3), \
+                mock.patch.object(EstimatedCountPaginator, "PAGES_AHEAD", 1), \
+                mock.patch("app_kino.admin.SessionAdmin.list_per_page", 1):
+            response = self.client.get("/admin/app_kino/session/", {"p": 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 6)
+        self.assertContains(response, "≈&nbsp;6")
+
+
+@override_settings(STREAMING_CHUNK_SIZE=2)
+class StreamingListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Movie.objects.bulk_create([Movie(title=f"Фильм {i}", duration=90) for i in range(5)])
+
+    def test_wsgi_stream(self):
+        response = self.client.get(reverse("app_kino:movie_list"), {"stream": "1"})
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(sum(f"Фильм {i}" in body for i in range(5)), 5)
+
+    async def test_asgi_stream_is_async_and_compressed(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            response = await self.async_client.get(reverse("app_kino:movie_list"), {"stream": "1"},
+                                                   headers={"accept-encoding": "gzip"})
+            self.assertTrue(response.is_async)
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            parts = [part async for part in response.streaming_content]
+        self.assertGreater(len(parts), 3)
+        body = gzip.decompress(b"".join(parts)).decode()
+        self.assertEqual(sum(f"Фильм {i}" in body for i in range(5)), 5)
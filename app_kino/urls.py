@@ -8,6 +8,7 @@ urlpatterns = [
     path("movies/", views.movie_list, name="movie_list"),
     path("movies/<int:pk>/", views.movie_detail, name="movie_detail"),
     path("search/", views.search, name="search"),
+    path("sessions/<int:pk>/buy/", views.session_buy, name="session_buy"),
 
     path("movies/create/", views.movie_create, name="movie_create"),
     path("movies/<int:pk>/edit/", views.movie_update, name="movie_update"),
@@ -0,0 +1,51 @@
+"""
+Общие для всех воркеров отметки версий в кэше Django.
+
+Процесс читает отметку не чаще раза в check_interval секунд, поэтому
+проверка «не устарели ли данные» почти ничего не стоит; save/delete
+в любом воркере записывают новую отметку, и остальные перестраивают
+свои локальные структуры лениво, при следующем обращении.
+
+Отметка — случайный токен, а не счётчик: запись одна (set без
+чтения), гонок incr нет, а пропавший из кэша ключ не может вернуть
+старое значение. Ключ пишется без срока жизни, новая отметка
+публикуется только после коммита транзакции, чтобы другие воркеры
+не перестроились по незакоммиченным данным.
+"""
+import secrets
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class SharedVersion:
+    __slots__ = ("key", "check_interval", "_value", "_checked_at")
+
+    def __init__(self, key: str, check_interval: float = 1.0):
+        self.key = key
+        self.check_interval = check_interval
+        self._value = None
+        self._checked_at = 0.0
+
+    def current(self) -> str:
+        now = time.monotonic()
+        if self._value is None or now - self._checked_at >= self.check_interval:
+            value = cache.get(self.key)
+            if value is None:
+                # ключа нет (первый запуск или вытеснен) — заводим общий для всех
+                cache.add(self.key, secrets.token_hex(8), timeout=None)
+                value = cache.get(self.key)
+            self._value = value
+            self._checked_at = now
+        return self._value
+
+    def bump(self):
+        """Новая отметка после коммита текущей транзакции (вне транзакции — сразу)."""
+        transaction.on_commit(self._publish)
+
+    def _publish(self):
+        value = secrets.token_hex(8)
+        cache.set(self.key, value, timeout=None)
+        self._value = value
+        self._checked_at = time.monotonic()
@@ -1,11 +1,20 @@
 from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db.models import Count, Avg, Min, Q
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Count, Avg, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import get_template, render_to_string
 from django.utils import timezone
 from django.urls import reverse
-from .models import Movie, Session, Cinema
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.hashers import make_password
+from django.views.decorators.http import require_POST
+from .models import Movie, Session, Ticket, User
 from .forms import MovieForm
+from . import facets, recommendations, refdata
 from django.contrib.auth.forms import UserCreationForm
 
 def home(request):
@@ -38,56 +47,133 @@ def home(request):
 
     todays_sessions = (
         Session.objects
-        .select_related('movie', 'hall', 'hall__cinema')
+        .select_related('movie')
         .filter(start_time__date=today)
         .exclude(start_time__lt=now)
         .order_by('start_time')[:3]
     )
 
+    recommended = []
+    if request.user.is_authenticated:
+        recommended = recommendations.recommend_for(request.user.get_username())
+
     return render(request, 'app_kino/home.html', {
         'upcoming_releases': upcoming_releases,
         'popular_movies': popular_movies,
         'todays_sessions': todays_sessions,
+        'recommended': recommended,
     })
 
 def movie_list(request):
-    movies = Movie.objects.all().order_by('title')
-    return render(request, 'app_kino/movie/list.html', {'movies': movies})
+    selected = {f: [v for v in request.GET.getlist(f) if v] for f in facets.FACETS}
+    index = facets.get_index()
+    mask, facet_counts = index.select(selected)
+
+    sort = request.GET.get('sort')
+    if sort == 'sessions':
+        movies = Movie.objects.order_by('-upcoming_sessions', 'title')
+    else:
+        sort = 'title'
+        movies = Movie.objects.order_by('title')
+    if any(selected.values()):
+        movies = movies.filter(pk__in=index.ids_for(mask))
+
+    context = {
+        'movies': movies,
+        'facet_counts': facet_counts,
+        'selected': selected,
+        'sort': sort,
+        'total_movies': mask.bit_count(),
+    }
+    stream = request.GET.get('stream')
+    if stream == '1' or (stream is None and settings.STREAMING_LISTINGS):
+        return _stream_listing(request, 'app_kino/movie/list.html', context, movies)
+    return render(request, 'app_kino/movie/list.html', context)
+
+STREAM_MARKER = '<!--stream-cards-->'
+
+def _stream_cards(head, tail, movies):
+    yield head
+    card = get_template('app_kino/movie/_card.html')
+    chunk_size = getattr(settings, 'STREAMING_CHUNK_SIZE', 50)
+    chunk = []
+    empty = True
+    for m in movies.iterator(chunk_size=chunk_size):
+        chunk.append(card.render({'m': m}))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+        empty = False
+    if chunk:
+        yield ''.join(chunk)
+    if empty:
+        yield get_template('app_kino/movie/_empty.html').render({})
+    yield tail
+
+async def _astream(chunks):
+    # под ASGI синхронный итератор Django сначала собрал бы целиком в список;
+    # здесь каждый кусок рендерится в потоке запроса и сразу уходит клиенту
+    get_next = sync_to_async(next)
+    while (chunk := await get_next(chunks, None)) is not None:
+        yield chunk
+
+def _stream_listing(request, template_name, context, movies):
+    """
+    Отдаёт страницу списка потоком: шапка (всё до сетки карточек) уходит
+    сразу, карточки рендерятся пачками по мере чтения из БД.
+    """
+    page = render_to_string(template_name, {**context, 'streaming': True, 'stream_marker': STREAM_MARKER}, request)
+    head, _, tail = page.partition(STREAM_MARKER)
+    chunks = _stream_cards(head, tail, movies)
+    if isinstance(request, ASGIRequest):
+        chunks = _astream(chunks)
+    return StreamingHttpResponse(chunks, content_type='text/html; charset=utf-8')
 
 def movie_detail(request, pk: int):
-    movie = get_object_or_404(
-        Movie.objects.prefetch_related("genres"),
-        pk=pk
-    )
+    movie = get_object_or_404(Movie, pk=pk)
+    ref = refdata.get()
+    # один запрос по индексу связующей таблицы; названия — из справочника в памяти
+    genre_ids = set(Movie.genres.through.objects.filter(movie_id=movie.pk).values_list("genre_id", flat=True))
+    genres = [g for g in ref.genres_sorted if g.pk in genre_ids]
 
     now = timezone.now()
     week_later = now + timezone.timedelta(days=7)
 
-    sessions = (
+    sessions = list(
         Session.objects
-        .select_related("hall", "cinema")
         .filter(movie=movie, start_time__range=(now, week_later))
-        .order_by("cinema__name", "start_time")
+        .order_by("start_time")
     )
 
-    by_cinema = (
-        sessions.values("cinema__id", "cinema__name")
-        .annotate(total=Count("id"), min_price=Min("price"))
-        .order_by("cinema__name")
-    )
+    # группировка по кинотеатрам — по справочнику в памяти, без JOIN и GROUP BY
+    by_cinema = {}
+    for s in sessions:
+        group = by_cinema.get(s.cinema_id)
+        if group is None:
+            group = by_cinema[s.cinema_id] = {
+                "cinema": ref.cinemas.get(s.cinema_id),
+                "sessions": [],
+                "min_price": s.price,
+            }
+        group["sessions"].append(s)
+        group["min_price"] = min(group["min_price"], s.price)
+    cinema_groups = sorted(by_cinema.values(), key=lambda g: g["cinema"].name if g["cinema"] else "")
 
-    similar = (
-        Movie.objects
-        .filter(genres__in=movie.genres.all())
-        .exclude(pk=movie.pk)
-        .distinct()
-        .order_by("release_date")[:4]
-    )
+    similar = []
+    if genre_ids:
+        similar = (
+            Movie.objects
+            .filter(genres__in=genre_ids)
+            .exclude(pk=movie.pk)
+            .distinct()
+            .order_by("release_date")[:4]
+        )
 
     return render(request, "app_kino/movie/detail.html", {
         "movie": movie,
+        "genres": genres,
         "sessions": sessions,
-        "by_cinema": list(by_cinema),
+        "cinema_groups": cinema_groups,
         "similar": similar,
     })
 
@@ -105,7 +191,6 @@ def search(request):
         return redirect("app_kino:movie_list")
 
     terms = _words(q)
-    now = timezone.now()
 #обход кириллицы
     is_sqlite = settings.DATABASES["default"]["ENGINE"].endswith("sqlite3")
 
@@ -124,13 +209,6 @@ def search(request):
         movies_qs = (
             Movie.objects
             .filter(pk__in=movie_ids)
-            .annotate(
-                upcoming_sessions=Count(
-                    "sessions",
-                    filter=Q(sessions__start_time__gte=now),
-                    distinct=True
-                )
-            )
             .order_by("-upcoming_sessions", "title")
         )
     else:
@@ -140,33 +218,14 @@ def search(request):
         movies_qs = (
             Movie.objects
             .filter(movie_filter)
-            .annotate(
-                upcoming_sessions=Count(
-                    "sessions",
-                    filter=Q(sessions__start_time__gte=now),
-                    distinct=True
-                )
-            )
             .order_by("-upcoming_sessions", "title")
         )
 
-    if is_sqlite:
-        cinemas_raw = Cinema.objects.values("id", "name", "address")
-        cinema_ids = []
-        for c in cinemas_raw:
-            ok = all(
-                _casefold_contains(c.get("name") or "", w) or
-                _casefold_contains(c.get("address") or "", w)
-                for w in terms
-            )
-            if ok:
-                cinema_ids.append(c["id"])
-        cinemas_qs = Cinema.objects.filter(pk__in=cinema_ids).order_by("name")
-    else:
-        cinema_filter = Q()
-        for w in terms:
-            cinema_filter &= (Q(name__icontains=w) | Q(address__icontains=w))
-        cinemas_qs = Cinema.objects.filter(cinema_filter).order_by("name")
+    # кинотеатры — из справочника в памяти, для любой БД
+    cinemas = [
+        c for c in refdata.get().cinemas_sorted
+        if all(_casefold_contains(c.name, w) or _casefold_contains(c.address, w) for w in terms)
+    ]
 
     from django.core.paginator import Paginator
     paginator = Paginator(movies_qs, 4)
@@ -175,11 +234,48 @@ def search(request):
     return render(request, "app_kino/search.html", {
         "q": q,
         "page_obj": page_obj,
-        "cinemas": cinemas_qs[:4],
+        "cinemas": cinemas[:4],
         "total_movies": movies_qs.count(),
-        "total_cinemas": cinemas_qs.count(),
+        "total_cinemas": len(cinemas),
     })
 
+def _buyer(request) -> User:
+    """
+    Покупатель из app_kino.User для вошедшего пользователя (сопоставляется по логину).
+    Пароль здесь не хранится; если e-mail уже занят другим покупателем — заглушка.
+    """
+    username = request.user.get_username()
+    placeholder = f"{username}@users.invalid"
+    for email in (request.user.email or placeholder, placeholder):
+        try:
+            buyer, _ = User.objects.get_or_create(
+                username=username,
+                defaults={"email": email, "password_hash": make_password(None)},
+            )
+            return buyer
+        except IntegrityError:
+            continue
+    return User.objects.get(username=username)
+
+@login_required
+@require_POST
+def session_buy(request, pk: int):
+    session = get_object_or_404(Session.objects.select_related("hall"), pk=pk)
+    buyer = _buyer(request)
+    try:
+        with transaction.atomic():
+            taken = set(Ticket.objects.filter(session=session).values_list("seat_number", flat=True))
+            seat = next((n for n in range(1, session.hall.seats + 1) if n not in taken), None)
+            if seat is None:
+                return HttpResponse("Свободных мест нет", status=409)
+            Ticket.objects.create(session=session, seat_number=seat, user=buyer)
+    except IntegrityError:
+        return HttpResponse("Место уже занято, попробуйте ещё раз", status=409)
+    except OperationalError:
+        # таймаут блокировки БД (sqlite: database is locked)
+        return HttpResponse("Сервис занят, попробуйте позже", status=503)
+    return redirect("app_kino:movie_detail", pk=session.movie_id)
+
 def movie_create(request):
     if request.method == "POST":
         form = MovieForm(request.POST)
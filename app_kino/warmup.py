@@ -0,0 +1,133 @@
+"""
+Прогрев нового воркера перед первыми запросами.
+
+Фазы: URL-резолвер, компиляция шаблонов, статика (манифест и заглушка
+постера), справочники и фасетный индекс, рендер главной и страниц top-N
+фильмов. Каждая фаза замеряется; run() вызывается командой warmup,
+из web/wsgi.py при загрузке и из web/asgi.py на событии lifespan.startup
+(в отдельном потоке: в цикле событий ORM недоступен) при WARMUP_ON_STARTUP.
+После прогрева соединения с БД закрываются, чтобы воркеры, форкнутые
+после gunicorn --preload, не унаследовали их.
+"""
+import logging
+import time
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import get_resolver, reverse
+
+from . import facets, refdata, views
+from .models import Movie
+from .templatetags.posters import poster_url
+
+logger = logging.getLogger(__name__)
+
+TOP_N = 10
+
+
+def _urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # заполняет таблицы reverse()
+    for name in ("app_kino:home", "app_kino:movie_list", "app_kino:search", "login", "signup"):
+        reverse(name)
+    return len(resolver.url_patterns)
+
+
+def _templates():
+    names = []
+    for directory in settings.TEMPLATES[0]["DIRS"]:
+        root = Path(directory)
+        names += sorted(str(p.relative_to(root)) for p in root.rglob("*.html"))
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def _static():
+    staticfiles_storage.url("css/style.css")
+    poster_url("")
+    return 2
+
+
+def _refdata():
+    data = refdata.get()
+    index = facets.get_index()
+    return len(data.genres) + len(data.cinemas) + len(data.halls) + len(index.ids)
+
+
+def _pages(top_n):
+    factory = RequestFactory()
+    request = factory.get(reverse("app_kino:home"))
+    request.user = AnonymousUser()
+    views.home(request)
+
+    movie_ids = list(
+        Movie.objects
+        .order_by("-upcoming_sessions", "title")
+        .values_list("pk", flat=True)[:top_n]
+    )
+    for pk in movie_ids:
+        request = factory.get(reverse("app_kino:movie_detail", args=[pk]))
+        request.user = AnonymousUser()
+        views.movie_detail(request, pk)
+    return len(movie_ids) + 1
+
+
+def run(top_n=TOP_N):
+    """Выполняет все фазы прогрева; возвращает [(фаза, объектов, секунд), ...]."""
+    phases = [
+        ("urls", _urls),
+        ("templates", _templates),
+        ("static", _static),
+        ("refdata", _refdata),
+        ("pages", lambda: _pages(top_n)),
+    ]
+    timings = []
+    for name, phase in phases:
+        started = time.perf_counter()
+        count = phase()
+        timings.append((name, count, time.perf_counter() - started))
+    return timings
+
+
+def on_startup():
+    """Хук для WSGI/ASGI: прогрев не должен ронять воркер."""
+    if not getattr(settings, "WARMUP_ON_STARTUP", False):
+        return
+    try:
+        timings = run(getattr(settings, "WARMUP_TOP_N", TOP_N))
+    except Exception:
+        logger.exception("Прогрев воркера не удался")
+        return
+    finally:
+        connections.close_all()
+    logger.info(
+        "Прогрев воркера: %s",
+        ", ".join(f"{name}={count} за {seconds * 1000:.0f} мс" for name, count, seconds in timings),
+    )
+
+
+def lifespan(application):
+    """
+    Оборачивает ASGI-приложение: прогрев на lifespan.startup в потоке
+    пула, остальные запросы — как есть (Django lifespan не обрабатывает).
+    """
+    async def app(scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await application(scope, receive, send)
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await sync_to_async(on_startup, thread_sensitive=False)()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    return app
@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'web.settings')
 
 application = get_asgi_application()
+
+from app_kino.warmup import lifespan  # noqa: E402
+
+application = lifespan(application)
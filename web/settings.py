@@ -21,14 +21,34 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app_kino.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app_kino.profiling.ProfilingMiddleware',
 ]
 
+# Выборочное профилирование: каждый N-й запрос (0 — только по заголовку X-Profile)
+PROFILING_SAMPLE_RATE = 1000
+PROFILING_INTERVAL = 0.005
+PROFILING_KEEP = 50
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_TOKEN_MAX_AGE = 600  # секунд жизни токена X-Profile
+
+# Прогрев воркера при старте (app_kino.warmup): шаблоны, справочники, top-N страниц фильмов
+WARMUP_ON_STARTUP = not DEBUG
+WARMUP_TOP_N = 10
+
+# Сжатие ответов: brotli, если установлен пакет brotli, иначе gzip
+COMPRESSION_BROTLI = True
+
+# Потоковая отдача списка фильмов (?stream=0/1 переопределяет для запроса)
+STREAMING_LISTINGS = True
+STREAMING_CHUNK_SIZE = 50
+
 ROOT_URLCONF = 'web.urls'
 
 TEMPLATES = [
@@ -61,6 +81,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Общий для воркеров на одной машине; отметки версий справочников и фасетов
+# (app_kino.versioning) должны быть видны всем процессам. В кластере — Redis/Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 